@@ -0,0 +1,190 @@
+"""Find plates in long recordings without decoding every frame
+
+Pass 1 samples the file sparsely, with one frame every `--interval` seconds:
+
+    keyframes only (PyAV installed): the decoder skips all non-key frames
+    time jumps (fallback):           cv2 seeks by timestamp and decodes one frame
+
+Any sample with at least `--min-digits` plate digits marks a candidate. Each
+candidate is widened to a window reaching the samples before and after it, since
+the plate may have been in view anywhere in between. Keyframes can lie further
+apart than `--interval`, so the window follows the actual sample spacing
+unless `--pad` fixes it. Overlapping windows are merged into segments.
+
+Pass 2 runs the dense batched video_predict pass (every `--stride`-th frame,
+with tracking) only inside those segments.
+
+    python archive_scan.py night_2024-05-01.mp4 -o reads.jsonl --interval 2 --pad 4
+"""
+import argparse
+import bisect
+import sys
+import time
+
+import cv2
+
+import backends
+import detections
+import plate_assembly
+import plate_store
+import video_predict
+from batch_predict import iter_batches
+from result_writer import ResultWriter
+
+FIELDS = video_predict.FIELDS + ["end_s"]
+
+
+def sample_keyframes(path, interval):
+    """Yield (time_s, image) from keyframes at least `interval` seconds apart (needs PyAV)"""
+    import av
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        stream.codec_context.skip_frame = "NONKEY"
+        next_time = 0.0
+        for frame in container.decode(stream):
+            if frame.pts is None:
+                continue
+            time_s = float(frame.pts * stream.time_base)
+            if time_s < next_time:
+                continue
+            next_time = time_s + interval
+            yield time_s, frame.to_ndarray(format="bgr24")
+
+
+def sample_by_time(path, interval):
+    """Yield (time_s, image) every `interval` seconds by seeking with cv2"""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    duration = frame_count / fps if frame_count > 0 else float("inf")
+    time_s = 0.0
+    while time_s < duration:
+        cap.set(cv2.CAP_PROP_POS_MSEC, time_s * 1000)
+        ret, image = cap.read()
+        if not ret:
+            break
+        yield time_s, image
+        time_s += interval
+    cap.release()
+
+
+def sample_frames(path, interval, keyframes=True):
+    """Keyframe sampling when PyAV can open the file, time jumps otherwise"""
+    if keyframes:
+        try:
+            # Pull the first sample eagerly so a missing or failing PyAV falls back cleanly
+            samples = sample_keyframes(path, interval)
+            first = next(samples, None)
+        except Exception:
+            first = samples = None
+        if first is not None:
+            yield first
+            yield from samples
+            return
+    yield from sample_by_time(path, interval)
+
+
+def hit_windows(hits, sample_times, interval, pad=None):
+    """(begin, end) of the dense pass around each hit time
+
+    By default a window runs from the sample before the hit to the sample
+    after it. The last sample looks ahead by the widest gap seen (at least
+    `interval`). A fixed `pad` gives [t - pad, t + pad] instead.
+    """
+    if pad is not None:
+        return [(max(0.0, t - pad), t + pad) for t in hits]
+    sample_times = sorted(sample_times)
+    widest = max([interval] + [b - a for a, b in zip(sample_times, sample_times[1:])])
+    windows = []
+    for t in hits:
+        i = bisect.bisect_left(sample_times, t)
+        begin = sample_times[i - 1] if i > 0 else 0.0
+        end = sample_times[i + 1] if i + 1 < len(sample_times) else t + widest
+        windows.append((begin, end))
+    return windows
+
+
+def merge_segments(windows, gap=0.0):
+    """Merge (begin, end) windows that overlap or lie within `gap` of each other"""
+    segments = []
+    for begin, end in sorted(windows):
+        if segments and begin <= segments[-1][1] + gap:
+            segments[-1][1] = max(segments[-1][1], end)
+        else:
+            segments.append([begin, end])
+    return [tuple(s) for s in segments]
+
+
+def scan(model, path, interval=2.0, conf=0.25, min_digits=3, batch_size=16, imgsz=640, keyframes=True):
+    """Pass 1: (times of samples showing at least `min_digits` plate digits, times of all samples)"""
+    chars = plate_assembly.class_chars(model.names)
+    none_class_idx = detections.find_none_class(model.names)
+    candidates = []
+    sample_times = []
+    for batch in iter_batches(sample_frames(path, interval, keyframes), batch_size):
+        results = model([image for _, image in batch], conf=conf, imgsz=imgsz, verbose=False)
+        for (time_s, _), result in zip(batch, results):
+            sample_times.append(time_s)
+            dets = detections.from_result(result)
+            dets = detections.select(dets, detections.keep_mask(dets, conf, none_class_idx))
+            digits = int((chars[dets.cls[dets.cls < len(chars)]] != "").sum())
+            if digits >= min_digits:
+                candidates.append(time_s)
+    return candidates, sample_times
+
+
+def run(model, path, writer, interval=2.0, pad=None, scan_conf=0.25, min_digits=3, keyframes=True,
+        batch_size=16, conf=0.5, imgsz=640, stride=1, skip_empty=False, store=None):
+    """Scan `path`, then densely process its candidate segments; returns (segments, samples, dense frames)"""
+    candidates, sample_times = scan(model, path, interval, scan_conf, min_digits, batch_size, imgsz, keyframes)
+    segments = merge_segments(hit_windows(candidates, sample_times, interval, pad))
+    samples = len(sample_times)
+    dense = 0
+    for begin, end in segments:
+        writer.write({"kind": "segment", "video": path, "time_s": round(begin, 3), "end_s": round(end, 3)})
+        dense += video_predict.run(model, path, writer, batch_size, conf, imgsz, stride, begin, end,
+                                   skip_empty=skip_empty, store=store)
+    return segments, samples, dense
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Two-pass plate search over long recordings")
+    parser.add_argument("videos", nargs="+", help="video files")
+    parser.add_argument("-o", "--output", default="archive_reads.jsonl", help="output file (.jsonl or .csv)")
+    parser.add_argument("--model", default="best_yolo11n_none.pt")
+    parser.add_argument("--backend", choices=("auto",) + backends.BACKENDS, default=None,
+                        help="inference runtime (default: fastest available)")
+    parser.add_argument("--int8", action="store_true", default=None,
+                        help="use the INT8 OpenVINO model built by quantize.py")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between scan samples")
+    parser.add_argument("--pad", type=float, default=None,
+                        help="fixed seconds of dense decoding around a hit (default: up to the neighbouring samples)")
+    parser.add_argument("--scan-conf", type=float, default=0.25, help="digit confidence during the scan")
+    parser.add_argument("--min-digits", type=int, default=3, help="digits a sample needs to count as a hit")
+    parser.add_argument("--no-keyframes", action="store_true", help="always sample by seeking with cv2")
+    parser.add_argument("--batch", type=int, default=16, help="frames per model call")
+    parser.add_argument("--conf", type=float, default=0.5, help="confidence for the dense pass")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--stride", type=int, default=1, help="dense pass: process every Nth frame")
+    parser.add_argument("--skip-empty", action="store_true", help="do not write frames without detections")
+    parser.add_argument("--store", help="also keep the plate reads in this plate_store database")
+    args = parser.parse_args(argv)
+
+    model = backends.load_model(args.model, args.backend, args.int8)
+    store = plate_store.PlateStore(args.store) if args.store else None
+
+    with ResultWriter(args.output, FIELDS) as writer:
+        for video in args.videos:
+            start = time.perf_counter()
+            segments, samples, dense = run(model, video, writer, args.interval, args.pad, args.scan_conf,
+                                           args.min_digits, not args.no_keyframes, args.batch, args.conf,
+                                           args.imgsz, max(1, args.stride), args.skip_empty, store)
+            covered = sum(end - begin for begin, end in segments)
+            print(f"{video}: {samples} scan samples, {len(segments)} segments ({covered:.0f}s), "
+                  f"{dense} dense frames in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    if store is not None:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
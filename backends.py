@@ -0,0 +1,134 @@
+"""CPU inference backends with automatic selection
+
+The PyTorch weights are exported once to ONNX and OpenVINO, and the exported
+files are cached next to the .pt. They are re-exported only when the .pt is
+newer. On first use, every available runtime is timed on a short calibration
+run. The fastest one is remembered in <weights>.backend.json until the weights
+change.
+
+Set PLATE_BACKEND=torch|onnx|openvino to skip the calibration and force a runtime.
+Set PLATE_INT8=1 (or pass int8=True) to use the INT8 OpenVINO model built by
+quantize.py instead of the FP32 weights.
+"""
+import importlib.util
+import json
+import os
+import time
+
+import numpy as np
+
+BACKENDS = ("openvino", "onnx", "torch")
+# Python packages each exported format needs at runtime
+RUNTIME_PACKAGES = {"openvino": "openvino", "onnx": "onnxruntime", "torch": "torch"}
+CALIBRATION_RUNS = 5
+IMGSZ = 640
+
+
+def artifact_path(weights, backend, int8=False):
+    """Where the exported model for `backend` lives, next to the .pt file"""
+    stem = os.path.splitext(weights)[0]
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        return stem + ("_int8" if int8 else "") + "_openvino_model"
+    return weights
+
+
+def available_backends():
+    return [b for b in BACKENDS if importlib.util.find_spec(RUNTIME_PACKAGES[b]) is not None]
+
+
+def export(weights, backend, int8=False, data=None, fraction=1.0):
+    """Export `weights` for `backend` unless an up-to-date export is already cached
+
+    INT8 exports are OpenVINO only and need `data` (a data.yaml) to calibrate
+    on; `fraction` limits calibration to part of that dataset.
+    """
+    if int8 and backend != "openvino":
+        raise ValueError("INT8 models are only available for the openvino backend")
+    path = artifact_path(weights, backend, int8)
+    if backend == "torch":
+        return path
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(weights):
+        return path
+    if int8 and data is None:
+        raise FileNotFoundError(f"{path} not found; build it with quantize.py")
+    from ultralytics import YOLO
+    if int8:
+        return YOLO(weights).export(format=backend, imgsz=IMGSZ, dynamic=True, int8=True,
+                                    data=data, fraction=fraction)
+    return YOLO(weights).export(format=backend, imgsz=IMGSZ, dynamic=True)
+
+
+def load(weights, backend, int8=False):
+    """Load `weights` with a specific runtime, exporting first if needed"""
+    from ultralytics import YOLO
+    return YOLO(export(weights, backend, int8), task="detect")
+
+
+def calibrate(model, runs=CALIBRATION_RUNS):
+    """Median single-image latency in milliseconds on a blank 640x640 frame"""
+    frame = np.full((IMGSZ, IMGSZ, 3), 114, dtype=np.uint8)
+    model(frame, imgsz=IMGSZ, verbose=False)  # Warm-up, excluded from timing
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(frame, imgsz=IMGSZ, verbose=False)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def _choice_path(weights):
+    return os.path.splitext(weights)[0] + ".backend.json"
+
+
+def select_backend(weights):
+    """Return (backend, model) for the fastest runtime, reusing a cached choice when valid"""
+    mtime = os.path.getmtime(weights)
+    choice_file = _choice_path(weights)
+    available = available_backends()
+    try:
+        with open(choice_file, encoding="utf-8") as f:
+            choice = json.load(f)
+        if choice.get("mtime") == mtime and choice.get("backend") in available:
+            return choice["backend"], load(weights, choice["backend"])
+    except (OSError, ValueError):
+        pass
+
+    timings = {}
+    best = None
+    for backend in available:
+        try:
+            model = load(weights, backend)
+            timings[backend] = calibrate(model)
+        except Exception as e:
+            # A runtime that fails to export or load is simply not a candidate
+            print(f"Backend {backend} unavailable: {e}")
+            continue
+        if best is None or timings[backend] < timings[best[0]]:
+            best = (backend, model)
+    if best is None:
+        raise RuntimeError(f"No inference backend could load {weights}")
+
+    try:
+        with open(choice_file, "w", encoding="utf-8") as f:
+            json.dump({"mtime": mtime, "backend": best[0], "latency_ms": timings}, f, indent=2)
+    except OSError:
+        pass
+    return best
+
+
+def load_model(weights="best_yolo11n_none.pt", backend=None, int8=None):
+    """Load the plate model on the fastest CPU runtime (or `backend` / $PLATE_BACKEND if set)
+
+    With `int8` (default: $PLATE_INT8) the quantized OpenVINO model is used.
+    Returns an ultralytics model, so callers keep using model(...) and model.names.
+    """
+    if int8 is None:
+        int8 = os.environ.get("PLATE_INT8", "0") == "1"
+    if int8:
+        return load(weights, "openvino", int8=True)
+    backend = backend or os.environ.get("PLATE_BACKEND", "auto")
+    if backend == "auto":
+        return select_backend(weights)[1]
+    return load(weights, backend)
@@ -0,0 +1,165 @@
+"""Headless batch plate-digit detection
+
+Reads images from directories, glob patterns or explicit file lists, runs them
+through the YOLO model in batches and writes one result per image to a JSONL or
+CSV file.
+
+    python batch_predict.py /data/gate_photos -o reads.jsonl --batch 16
+    python batch_predict.py "archive/**/*.jpg" --list extra.txt -o reads.csv
+"""
+import argparse
+import glob
+import os
+import queue
+import sys
+import time
+from threading import Thread
+
+import cv2
+
+import backends
+import detections
+import plate_assembly
+import plate_format
+from result_writer import ResultWriter
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+FIELDS = ["path", "width", "height", "count", "plate", "plate_conf", "plate_valid", "wilaya", "suggestions", "detections", "error"]
+_DONE = object()
+
+
+def collect_paths(inputs, list_files=(), recursive=False):
+    """Expand directories, glob patterns and list files into image paths"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                for dirpath, _, filenames in os.walk(item):
+                    paths.extend(os.path.join(dirpath, f) for f in sorted(filenames))
+            else:
+                paths.extend(os.path.join(item, f) for f in sorted(os.listdir(item)))
+        elif any(ch in item for ch in "*?["):
+            paths.extend(sorted(glob.glob(item, recursive=True)))
+        else:
+            paths.append(item)
+    for list_file in list_files:
+        with open(list_file, encoding="utf-8") as f:
+            paths.extend(line.strip() for line in f if line.strip())
+    return [p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def start_prefetch(paths, prefetch=64, workers=2):
+    """Decode images on background threads into a bounded queue
+
+    Yields (path, image) pairs; image is None when the file cannot be decoded.
+    At most `prefetch` decoded images are held in memory at any time.
+    """
+    path_queue = queue.Queue()
+    for p in paths:
+        path_queue.put(p)
+    out_queue = queue.Queue(maxsize=max(1, prefetch))
+
+    def decode():
+        while True:
+            try:
+                p = path_queue.get_nowait()
+            except queue.Empty:
+                break
+            out_queue.put((p, cv2.imread(p)))
+        out_queue.put(_DONE)
+
+    workers = max(1, workers)
+    for _ in range(workers):
+        Thread(target=decode, daemon=True).start()
+
+    finished = 0
+    while finished < workers:
+        item = out_queue.get()
+        if item is _DONE:
+            finished += 1
+            continue
+        yield item
+
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def plate_record(dets, chars, class_names):
+    """Assembled plate, its DZ layout check and the raw detections as a JSON-friendly dict"""
+    plate = plate_assembly.assemble(dets, chars)
+    plate_check = plate_format.check(plate.text, plate.conf)
+    return {
+        "count": len(dets.cls),
+        "plate": plate.text,
+        "plate_conf": [round(float(c), 4) for c in plate.conf],
+        "plate_valid": plate_check.valid,
+        "wilaya": plate_check.wilaya_name,
+        "suggestions": [text for text, _ in plate_check.suggestions],
+        "detections": detections.to_records(dets, class_names),
+    }
+
+
+def run(model, paths, writer, batch_size=16, conf=0.5, imgsz=640, prefetch=64, workers=2):
+    """Run batched inference over `paths`, writing one row per image; returns image count"""
+    class_names = model.names
+    chars = plate_assembly.class_chars(class_names)
+    count = 0
+    for batch in iter_batches(start_prefetch(paths, prefetch, workers), batch_size):
+        for path, img in batch:
+            if img is None:
+                writer.write({"path": path, "error": "unreadable image"})
+                count += 1
+        valid = [(path, img) for path, img in batch if img is not None]
+        if not valid:
+            continue
+        results = model([img for _, img in valid], conf=conf, imgsz=imgsz, verbose=False)
+        for (path, img), result in zip(valid, results):
+            row = {"path": path, "width": img.shape[1], "height": img.shape[0]}
+            row.update(plate_record(detections.from_result(result), chars, class_names))
+            writer.write(row)
+            count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch plate-digit detection over many images")
+    parser.add_argument("inputs", nargs="*", help="image files, directories or glob patterns")
+    parser.add_argument("--list", action="append", default=[], help="text file with one image path per line")
+    parser.add_argument("-o", "--output", default="predictions.jsonl", help="output file (.jsonl or .csv)")
+    parser.add_argument("--model", default="best_yolo11n_none.pt")
+    parser.add_argument("--backend", choices=("auto",) + backends.BACKENDS, default=None,
+                        help="inference runtime (default: fastest available)")
+    parser.add_argument("--int8", action="store_true", default=None,
+                        help="use the INT8 OpenVINO model built by quantize.py")
+    parser.add_argument("--batch", type=int, default=16, help="images per model call")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--prefetch", type=int, default=64, help="max decoded images held in memory")
+    parser.add_argument("--workers", type=int, default=2, help="decoder threads")
+    parser.add_argument("--recursive", action="store_true", help="descend into subdirectories")
+    args = parser.parse_args(argv)
+
+    paths = collect_paths(args.inputs, args.list, args.recursive)
+    if not paths:
+        parser.error("no images found")
+
+    model = backends.load_model(args.model, args.backend, args.int8)
+
+    start = time.perf_counter()
+    with ResultWriter(args.output, FIELDS) as writer:
+        count = run(model, paths, writer, args.batch, args.conf, args.imgsz, args.prefetch, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"{count} images in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.1f} images/sec) -> {args.output}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
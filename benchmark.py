@@ -0,0 +1,220 @@
+"""Benchmark the inference paths the apps use and catch regressions
+
+Each case runs a fixed number of iterations after a short warm-up:
+
+    infer     model(images, conf=...) on a batch of frames
+    filter    from_result + "none"-class/confidence mask + result[mask] (slider / toggle path)
+    plot      result.plot(conf=False)
+    overlay   OverlayRenderer.render into an RGB buffer (what the apps draw with)
+    display   resize + BGR->RGB + PIL frombytes, as in FramePresenter
+    display_pil  PIL LANCZOS resize of the RGB overlay buffer, as in test_img.py
+
+Inputs are synthetic frames (noise with printed digits) at each resolution. With
+--images, sample photos resized to the same resolutions are used as well.
+Results go to a JSON file: p50/p95/p99/mean latency in ms, throughput in
+images/s, and peak RSS in MB. ru_maxrss is a process-wide high-water mark, so
+each case reports the peak reached so far. The run is compared against a stored
+baseline, and the exit status is 1 if any case got slower than --tolerance.
+
+    python benchmark.py -o bench.json
+    python benchmark.py --images samples/*.jpg --baseline bench_baseline.json
+    python benchmark.py --update-baseline bench_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import backends
+import detections
+import overlay
+
+RESOLUTIONS = ("640x480", "1280x720", "1920x1080")
+BATCH_SIZES = (1, 4, 8)
+DISPLAY_SCALE = 0.5
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def synthetic_frame(width, height, seed=0):
+    """Gray noise with a white plate-like box of black digits in the lower middle"""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(60, 200, (height, width, 3), dtype=np.uint8)
+    pw, ph = width // 3, height // 10
+    x, y = (width - pw) // 2, int(height * 0.7)
+    cv2.rectangle(frame, (x, y), (x + pw, y + ph), (255, 255, 255), -1)
+    cv2.putText(frame, "01234 123 16", (x + pw // 20, y + int(ph * 0.75)), cv2.FONT_HERSHEY_SIMPLEX,
+                ph / 40, (0, 0, 0), max(1, ph // 15))
+    return frame
+
+
+def load_samples(paths, width, height):
+    frames = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is not None:
+            frames.append(cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA))
+    return frames
+
+
+def time_case(fn, iterations, warmup, images_per_iter):
+    """Run fn() warmup + iterations times; latency stats of the timed runs"""
+    for _ in range(warmup):
+        fn()
+    times = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - start
+    ms = times * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "throughput": round(images_per_iter * iterations / max(float(times.sum()), 1e-9), 2),
+        "iterations": iterations,
+        "images_per_iter": images_per_iter,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def run(model, resolutions=RESOLUTIONS, batch_sizes=BATCH_SIZES, images=(), iterations=20, warmup=3, conf=0.5):
+    """Time every path on every input set; returns {case name: stats}"""
+    none_class_idx = detections.find_none_class(model.names)
+    renderer = overlay.OverlayRenderer(model.names, rgb=True)
+    results = {}
+    for resolution in resolutions:
+        width, height = (int(v) for v in resolution.split("x"))
+        sets = {"synthetic": [synthetic_frame(width, height, seed) for seed in range(max(batch_sizes))]}
+        samples = load_samples(images, width, height)
+        if samples:
+            sets["sample"] = samples
+        for set_name, frames in sets.items():
+            prefix = f"{set_name}/{resolution}"
+            for batch_size in batch_sizes:
+                batch = [frames[i % len(frames)] for i in range(batch_size)]
+                results[f"infer/{prefix}/b{batch_size}"] = time_case(
+                    lambda: model(batch, conf=detections.RAW_CONF, verbose=False), iterations, warmup, batch_size)
+
+            frame = frames[0]
+            result = model(frame, conf=detections.RAW_CONF, verbose=False)[0]
+
+            def filter_boxes():
+                dets = detections.from_result(result)
+                return result[detections.keep_mask(dets, conf, none_class_idx)]
+
+            results[f"filter/{prefix}"] = time_case(filter_boxes, iterations, warmup, 1)
+            shown = filter_boxes()
+            results[f"plot/{prefix}"] = time_case(lambda: shown.plot(conf=False), iterations, warmup, 1)
+            shown_dets = detections.from_result(shown)
+            results[f"overlay/{prefix}"] = time_case(
+                lambda: renderer.render(frame, shown_dets), iterations, warmup, 1)
+
+            plotted = shown.plot(conf=False)
+            size = (max(1, int(width * DISPLAY_SCALE)), max(1, int(height * DISPLAY_SCALE)))
+            resize_buf = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            rgb_buf = np.empty_like(resize_buf)
+            pil_image = Image.new("RGB", size)
+
+            def display():
+                cv2.resize(plotted, size, dst=resize_buf)
+                cv2.cvtColor(resize_buf, cv2.COLOR_BGR2RGB, dst=rgb_buf)
+                pil_image.frombytes(rgb_buf.data)
+
+            results[f"display/{prefix}"] = time_case(display, iterations, warmup, 1)
+            rendered = renderer.render(frame, shown_dets)
+            results[f"display_pil/{prefix}"] = time_case(
+                lambda: Image.fromarray(rendered).resize(size, Image.LANCZOS), iterations, warmup, 1)
+    return results
+
+
+def compare(results, baseline, tolerance=0.1, metric="p50_ms", min_delta_ms=0.1):
+    """Cases whose `metric` grew by more than `tolerance` vs. the baseline: [(case, base, now, ratio)]
+
+    Changes smaller than `min_delta_ms` are ignored, since sub-millisecond cases are mostly timer noise.
+    """
+    regressions = []
+    for case, stats in results.items():
+        base = baseline.get(case)
+        if base is None or not base.get(metric):
+            continue
+        ratio = stats[metric] / base[metric]
+        if ratio > 1 + tolerance and stats[metric] - base[metric] >= min_delta_ms:
+            regressions.append((case, base[metric], stats[metric], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latency/throughput benchmark of the plate inference paths")
+    parser.add_argument("--model", default="best_yolo11n_none.pt")
+    parser.add_argument("--backend", choices=("auto",) + backends.BACKENDS, default=None,
+                        help="inference runtime (default: fastest available)")
+    parser.add_argument("--int8", action="store_true", default=None,
+                        help="use the INT8 OpenVINO model built by quantize.py")
+    parser.add_argument("--images", nargs="*", default=[], help="sample photos to benchmark alongside synthetic frames")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), help="WIDTHxHEIGHT inputs")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=list(BATCH_SIZES))
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("-o", "--output", default="benchmark.json")
+    parser.add_argument("--baseline", help="earlier benchmark JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown (0.1 = 10%%)")
+    parser.add_argument("--metric", default="p50_ms", choices=("p50_ms", "p95_ms", "p99_ms", "mean_ms"))
+    parser.add_argument("--update-baseline", metavar="PATH",
+                        help="also store this run as the new baseline (skipped if --baseline finds a regression)")
+    args = parser.parse_args(argv)
+
+    model = backends.load_model(args.model, args.backend, args.int8)
+    results = run(model, args.resolutions, args.batch_sizes, args.images, args.iterations, args.warmup, args.conf)
+    report = {
+        "meta": {
+            "model": args.model,
+            "backend": args.backend or os.environ.get("PLATE_BACKEND", "auto"),
+            "int8": bool(args.int8),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+    print(f"{'case':<40}{'p50':>10}{'p95':>10}{'p99':>10}{'img/s':>10}")
+    for case, stats in results.items():
+        print(f"{case:<40}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['throughput']:>10}")
+    print(f"peak RSS: {peak_rss_mb():.1f} MB")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    # Compare before refreshing, so --baseline and --update-baseline may name the same file
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance, args.metric)
+        for case, before, now, ratio in regressions:
+            print(f"REGRESSION {case}: {args.metric} {before} -> {now} ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions vs. {args.baseline} ({args.metric}, tolerance {args.tolerance:.0%})")
+
+    if args.update_baseline:
+        with open(args.update_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import numpy as np
+from collections import namedtuple
+
+# Plain NumPy view of one YOLO result: xyxy (N, 4), cls (N,), conf (N,)
+Detections = namedtuple("Detections", ["xyxy", "cls", "conf"])
+
+# Raw predictions are cached at this floor; UI thresholds are then applied as masks
+RAW_CONF = 0.05
+
+
+def find_none_class(class_names):
+    """Return the index of the "none" class, or None if the model has no such class"""
+    for idx, name in class_names.items():
+        if name.lower() == "none":
+            return idx
+    return None
+
+
+def empty():
+    """Detections with no boxes"""
+    return Detections(
+        np.zeros((0, 4), dtype=np.float32),
+        np.zeros(0, dtype=np.int64),
+        np.zeros(0, dtype=np.float32),
+    )
+
+
+def from_result(result):
+    """Copy the boxes of an ultralytics result into NumPy arrays"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return empty()
+    data = boxes.data
+    if not isinstance(data, np.ndarray):
+        data = data.cpu().numpy()
+    return Detections(
+        data[:, :4].astype(np.float32, copy=False),
+        data[:, -1].astype(np.int64),
+        data[:, -2].astype(np.float32, copy=False),
+    )
+
+
+def result_with_boxes(template, image, data):
+    """New ultralytics result on `image` holding box rows (x1, y1, x2, y2, conf, cls)
+
+    `template` supplies the class names and timing info; boxes are clipped to `image`.
+    """
+    result = type(template)(orig_img=image, path=template.path, names=template.names, speed=template.speed)
+    result.update(boxes=data)
+    return result
+
+
+def remap_result(result, image, scale=1.0, offset=(0.0, 0.0)):
+    """Copy of `result` on `image` with box coordinates mapped as xy * scale + offset"""
+    data = result.boxes.data
+    data = data.clone() if hasattr(data, "clone") else data.copy()
+    data[:, 0:4:2] = data[:, 0:4:2] * scale + offset[0]
+    data[:, 1:4:2] = data[:, 1:4:2] * scale + offset[1]
+    return result_with_boxes(result, image, data)
+
+
+def keep_mask(dets, conf_threshold, hidden_cls=None):
+    """Boolean mask of detections at or above `conf_threshold`, excluding class `hidden_cls`"""
+    mask = dets.conf >= conf_threshold
+    if hidden_cls is not None:
+        mask &= dets.cls != hidden_cls
+    return mask
+
+
+def select(dets, mask):
+    """Subset of detections picked by a boolean mask or index array"""
+    return Detections(dets.xyxy[mask], dets.cls[mask], dets.conf[mask])
+
+
+def to_records(dets, class_names):
+    """Convert detections to a list of JSON-friendly dicts"""
+    return [
+        {
+            "cls": int(c),
+            "name": class_names.get(int(c), str(int(c))),
+            "conf": round(float(p), 4),
+            "xyxy": [round(float(v), 1) for v in box],
+        }
+        for box, c, p in zip(dets.xyxy, dets.cls, dets.conf)
+    ]
@@ -0,0 +1,255 @@
+"""Evaluate plate-digit weights on a YOLO-format dataset and gate rollouts
+
+Images of one split are decoded on background threads and inferred in
+batches. As each batch finishes, its predictions are scored in a process pool
+while the next batch is inferred. The report covers:
+
+    box mAP50 and mAP50-95 (per class and overall, 101-point interpolated AP)
+    per-digit precision / recall at IoU 0.5 and --conf
+    plate-string exact-match accuracy (assembled as in the apps)
+
+    python evaluate.py --weights runs/detect/train/weights/best.pt --data matricule_number_detection-1/data.yaml
+    python evaluate.py --weights best.pt --data ... --min-map50 0.9 --min-plate-accuracy 0.8 --baseline eval_prod.json
+    python evaluate.py --weights best.pt --packed packs/val   # pre-decoded shard from packed_dataset.py
+
+It exits with status 1 if any gate fails, so it can block a rollout.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+import backends
+import detections
+import plate_assembly
+import yolo_dataset
+from batch_predict import iter_batches, start_prefetch
+from packed_dataset import PackedDataset
+from plate_tracker import box_iou
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+# Predictions are kept down to this confidence for mAP, as ultralytics val does
+MAP_CONF = 0.001
+
+
+def match_predictions(pred, gt, iou_thresholds=IOU_THRESHOLDS):
+    """(N_pred, T) bool: prediction i is a true positive at threshold t (greedy by confidence, same class)
+
+    Shared with quantize.py, so mAP and INT8-vs-FP32 digit accuracy score matches the same way.
+    """
+    tp = np.zeros((len(pred.cls), len(iou_thresholds)), dtype=bool)
+    if len(pred.cls) == 0 or len(gt.cls) == 0:
+        return tp
+    iou = box_iou(pred.xyxy, gt.xyxy)
+    iou[pred.cls[:, None] != gt.cls[None, :]] = 0
+    order = np.argsort(-pred.conf, kind="stable")
+    for t, threshold in enumerate(iou_thresholds):
+        taken = np.zeros(len(gt.cls), dtype=bool)
+        for p in order:
+            candidates = np.where(taken, 0, iou[p])
+            g = int(np.argmax(candidates))
+            if candidates[g] >= threshold:
+                taken[g] = True
+                tp[p, t] = True
+    return tp
+
+
+def score_image(pred, gt, chars, conf):
+    """Everything the report needs from one image, small enough to send between processes"""
+    tp = match_predictions(pred, gt)
+    is_digit = (pred.cls < len(chars)) & (chars[np.minimum(pred.cls, len(chars) - 1)] != "")
+    kept = (pred.conf >= conf) & is_digit
+    gt_digit = (gt.cls < len(chars)) & (chars[np.minimum(gt.cls, len(chars) - 1)] != "")
+    gt_plate = plate_assembly.assemble(gt, chars).text
+    pred_plate = plate_assembly.assemble(detections.select(pred, pred.conf >= conf), chars).text
+    return {
+        "tp": tp,
+        "conf": pred.conf,
+        "pred_cls": pred.cls,
+        "gt_cls": gt.cls,
+        "digit_tp": int(tp[kept, 0].sum()),
+        "digit_pred": int(kept.sum()),
+        "digit_gt": int(gt_digit.sum()),
+        "gt_plate": gt_plate,
+        "pred_plate": pred_plate,
+    }
+
+
+def score_batch(items, chars, conf):
+    """Pool task: score a list of (path, pred, gt) triples"""
+    return [(path, score_image(pred, gt, chars, conf)) for path, pred, gt in items]
+
+
+def average_precision(recall, precision):
+    """COCO-style 101-point interpolated AP of one precision/recall curve"""
+    precision = np.concatenate(([1.0], precision, [0.0]))
+    recall = np.concatenate(([0.0], recall, [1.0]))
+    precision = np.flip(np.maximum.accumulate(np.flip(precision)))
+    points = np.linspace(0, 1, 101)
+    index = np.searchsorted(recall, points, side="left")
+    return float(precision[np.minimum(index, len(precision) - 1)].mean())
+
+
+def class_ap(tp, conf, pred_cls, gt_cls, classes):
+    """(len(classes), T) AP matrix from the concatenated per-image matches"""
+    order = np.argsort(-conf, kind="stable")
+    tp, pred_cls = tp[order], pred_cls[order]
+    ap = np.zeros((len(classes), tp.shape[1]))
+    for i, c in enumerate(classes):
+        n_gt = int((gt_cls == c).sum())
+        hits = tp[pred_cls == c]
+        if n_gt == 0 or len(hits) == 0:
+            continue
+        true_pos = np.cumsum(hits, axis=0)
+        false_pos = np.cumsum(~hits, axis=0)
+        recall = true_pos / n_gt
+        precision = true_pos / (true_pos + false_pos)
+        for t in range(tp.shape[1]):
+            ap[i, t] = average_precision(recall[:, t], precision[:, t])
+    return ap
+
+
+def summarize(scores, names):
+    """Merge per-image scores into the JSON report"""
+    iou_count = len(IOU_THRESHOLDS)
+    tp = np.concatenate([s["tp"] for s in scores]) if scores else np.zeros((0, iou_count), dtype=bool)
+    conf = np.concatenate([s["conf"] for s in scores]) if scores else np.zeros(0)
+    pred_cls = np.concatenate([s["pred_cls"] for s in scores]) if scores else np.zeros(0, dtype=np.int64)
+    gt_cls = np.concatenate([s["gt_cls"] for s in scores]) if scores else np.zeros(0, dtype=np.int64)
+    classes = sorted(set(gt_cls.tolist()))
+    ap = class_ap(tp, conf, pred_cls, gt_cls, classes)
+
+    digit_tp = sum(s["digit_tp"] for s in scores)
+    digit_pred = sum(s["digit_pred"] for s in scores)
+    digit_gt = sum(s["digit_gt"] for s in scores)
+    plates = [s for s in scores if s["gt_plate"]]
+    plates_ok = sum(s["pred_plate"] == s["gt_plate"] for s in plates)
+    return {
+        "images": len(scores),
+        "map50": round(float(ap[:, 0].mean()), 4) if classes else 0.0,
+        "map50_95": round(float(ap.mean()), 4) if classes else 0.0,
+        "digit_precision": round(digit_tp / max(digit_pred, 1), 4),
+        "digit_recall": round(digit_tp / max(digit_gt, 1), 4),
+        "plate_accuracy": round(plates_ok / max(len(plates), 1), 4),
+        "plates": len(plates),
+        "per_class": {
+            names.get(c, str(c)): {"map50": round(float(ap[i, 0]), 4), "map50_95": round(float(ap[i].mean()), 4),
+                                   "instances": int((gt_cls == c).sum())}
+            for i, c in enumerate(classes)
+        },
+    }
+
+
+def iter_samples(data, split="val", limit=None, prefetch=64):
+    """Yield (path, image, ground truth) for the images of a split, decoded on background threads"""
+    paths = yolo_dataset.list_images(yolo_dataset.split_dir(data, split))[:limit]
+    for path, image in start_prefetch(paths, prefetch):
+        if image is None:
+            continue
+        labels = yolo_dataset.read_labels(yolo_dataset.label_path(path))
+        yield path, image, yolo_dataset.labels_to_detections(labels, image.shape[1], image.shape[0])
+
+
+def evaluate(model, data, split="val", conf=0.5, batch_size=16, imgsz=640, workers=None, limit=None,
+             prefetch=64, packed=None):
+    """Run inference over a split (or a packed shard) and score it in parallel; returns the report dict"""
+    if packed:
+        dataset = PackedDataset(packed)
+        names, split = dataset.names, dataset.meta["split"]
+        samples = dataset.samples(limit)
+    else:
+        _, names = yolo_dataset.read_data_yaml(data)
+        samples = iter_samples(data, split, limit, prefetch)
+    chars = plate_assembly.class_chars(names)
+    workers = workers or max(1, (os.cpu_count() or 2) // 2)
+
+    start = time.perf_counter()
+    pending = []
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers) as pool:
+        for batch in iter_batches(samples, batch_size):
+            results = model([image for _, image, _ in batch], conf=MAP_CONF, imgsz=imgsz, verbose=False)
+            items = [(path, detections.from_result(result), gt) for (path, _, gt), result in zip(batch, results)]
+            # Scoring of this batch overlaps with inference of the next one
+            pending.append(pool.apply_async(score_batch, (items, chars, conf)))
+        inference_s = time.perf_counter() - start
+        scores = [score for task in pending for _, score in task.get()]
+
+    report = summarize(scores, names)
+    report.update({"split": split, "conf": conf, "inference_s": round(inference_s, 2),
+                   "total_s": round(time.perf_counter() - start, 2)})
+    return report
+
+
+def check_gates(report, minimums, baseline=None, max_drop=0.01):
+    """Failed gate messages: absolute minimums, plus no metric more than `max_drop` below the baseline"""
+    failures = []
+    for key, minimum in minimums.items():
+        if minimum is not None and report[key] < minimum:
+            failures.append(f"{key} {report[key]} < {minimum}")
+    if baseline is not None:
+        for key in ("map50", "map50_95", "digit_precision", "digit_recall", "plate_accuracy"):
+            if key in baseline and report[key] < baseline[key] - max_drop:
+                failures.append(f"{key} {report[key]} dropped from baseline {baseline[key]}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate plate-digit weights on a YOLO-format dataset")
+    parser.add_argument("--weights", default="best_yolo11n_none.pt")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="data.yaml of the dataset")
+    source.add_argument("--packed", help="shard directory written by packed_dataset.py (replaces --data/--split)")
+    parser.add_argument("--split", default="val")
+    parser.add_argument("--backend", choices=("auto",) + backends.BACKENDS, default=None,
+                        help="inference runtime (default: fastest available)")
+    parser.add_argument("--int8", action="store_true", default=None,
+                        help="use the INT8 OpenVINO model built by quantize.py")
+    parser.add_argument("--conf", type=float, default=0.5, help="confidence for digit and plate metrics")
+    parser.add_argument("--batch", type=int, default=16, help="images per model call")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes")
+    parser.add_argument("--limit", type=int, default=None, help="evaluate at most this many images")
+    parser.add_argument("-o", "--report", default="eval_report.json")
+    parser.add_argument("--min-map50", type=float, default=None)
+    parser.add_argument("--min-map50-95", type=float, default=None)
+    parser.add_argument("--min-digit-recall", type=float, default=None)
+    parser.add_argument("--min-plate-accuracy", type=float, default=None)
+    parser.add_argument("--baseline", help="report of the weights in production; fail on drops beyond --max-drop")
+    parser.add_argument("--max-drop", type=float, default=0.01)
+    args = parser.parse_args(argv)
+
+    model = backends.load_model(args.weights, args.backend, args.int8)
+    report = evaluate(model, args.data, args.split, args.conf, args.batch, args.imgsz, args.workers, args.limit,
+                      packed=args.packed)
+    report["weights"] = args.weights
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    failures = check_gates(report, {
+        "map50": args.min_map50,
+        "map50_95": args.min_map50_95,
+        "digit_recall": args.min_digit_recall,
+        "plate_accuracy": args.min_plate_accuracy,
+    }, baseline, args.max_drop)
+    report["gate_failures"] = failures
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    for key in ("images", "map50", "map50_95", "digit_precision", "digit_recall", "plate_accuracy", "total_s"):
+        print(f"{key:<18}{report[key]}")
+    print(f"Report written to {args.report}")
+    for failure in failures:
+        print(f"GATE FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
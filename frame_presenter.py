@@ -0,0 +1,94 @@
+"""Hand video frames to the Tk main loop without touching widgets off-thread
+
+Worker threads call submit(); the Tk thread polls a single-slot mailbox with
+after() and draws only the newest frame. One PhotoImage is reused through
+paste() and the resize/convert buffers are kept between frames, so nothing is
+reallocated unless the display size changes.
+"""
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+from perf_timing import timer
+from video_pipeline import LatestSlot
+
+
+class FramePresenter:
+    """Show BGR frames in a Tk label; submit() may be called from any thread"""
+
+    def __init__(self, root, label, interval_ms=10):
+        self.root = root
+        self.label = label
+        self.interval_ms = interval_ms
+        self.slot = LatestSlot()
+        self.size = None
+        self.resize_buf = None
+        self.gray_buf = None
+        self.rgb_buf = None
+        self.image = None
+        self.photo = None
+        self.after_id = None
+
+    def start(self):
+        if self.after_id is None:
+            self.after_id = self.root.after(self.interval_ms, self._poll)
+
+    def stop(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def submit(self, frame, scale=1.0, callback=None):
+        """Queue a frame for display, replacing any frame not yet shown
+
+        `callback` runs on the Tk thread right after the frame is drawn, which
+        is the place to update other widgets (labels, buttons) safely.
+        """
+        self.slot.put((frame, scale, callback))
+
+    def clear(self):
+        """Drop any pending frame and blank the label (Tk thread only)"""
+        self.slot.get(timeout=0)
+        self.label.config(image="")
+        self.label.image = None
+        self.size = None
+        self.photo = None
+
+    def _poll(self):
+        item = self.slot.get(timeout=0)
+        if item is not None:
+            frame, scale, callback = item
+            if frame is not None:
+                with timer.stage("display"):
+                    self._show(frame, scale)
+                timer.frame_done()
+            if callback is not None:
+                callback()
+        self.after_id = self.root.after(self.interval_ms, self._poll)
+
+    def _show(self, frame, scale):
+        height, width = frame.shape[:2]
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        if size != self.size:
+            self._allocate(size)
+
+        if size != (width, height):
+            buf = self.resize_buf if frame.ndim == 3 else self.gray_buf
+            cv2.resize(frame, size, dst=buf)
+            frame = buf
+        code = cv2.COLOR_BGR2RGB if frame.ndim == 3 else cv2.COLOR_GRAY2RGB
+        cv2.cvtColor(frame, code, dst=self.rgb_buf)
+
+        self.image.frombytes(self.rgb_buf.data)
+        self.photo.paste(self.image)
+
+    def _allocate(self, size):
+        width, height = size
+        self.size = size
+        self.resize_buf = np.empty((height, width, 3), dtype=np.uint8)
+        self.gray_buf = np.empty((height, width), dtype=np.uint8)
+        self.rgb_buf = np.empty((height, width, 3), dtype=np.uint8)
+        self.image = Image.new("RGB", size)
+        self.photo = ImageTk.PhotoImage(self.image)
+        self.label.config(image=self.photo)
+        self.label.image = self.photo
@@ -0,0 +1,46 @@
+"""Aspect-preserving resize into a reusable square buffer
+
+The same letterboxed buffer is fed to the model and shown on screen, so an
+image is decoded and resized exactly once, and digits keep their proportions
+instead of being stretched to 640x640.
+"""
+import cv2
+import numpy as np
+
+PAD_COLOR = 114  # Same gray the YOLO preprocessing pads with
+
+
+class Letterbox:
+    """Letterbox images into one preallocated size x size BGR buffer"""
+
+    def __init__(self, size=640, color=PAD_COLOR):
+        self.size = size
+        self.color = color
+        self.buffer = np.full((size, size, 3), color, dtype=np.uint8)
+        self.scale = 1.0
+        self.pad = (0, 0)
+        self.region = None
+
+    def apply(self, image):
+        """Resize `image` into the buffer with padding; returns the buffer"""
+        height, width = image.shape[:2]
+        scale = min(self.size / height, self.size / width)
+        new_w, new_h = max(1, round(width * scale)), max(1, round(height * scale))
+        pad_x, pad_y = (self.size - new_w) // 2, (self.size - new_h) // 2
+        region = (pad_x, pad_y, new_w, new_h)
+        if region != self.region:
+            self.buffer[:] = self.color
+            self.region = region
+        self.scale = scale
+        self.pad = (pad_x, pad_y)
+
+        target = self.buffer[pad_y:pad_y + new_h, pad_x:pad_x + new_w]
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        cv2.resize(image, (new_w, new_h), dst=target, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        return self.buffer
+
+    def dets_to_buffer(self, dets):
+        """Map Detections in original-image coordinates onto the letterboxed buffer"""
+        offset = np.array([*self.pad, *self.pad], dtype=np.float32)
+        return dets._replace(xyxy=dets.xyxy * np.float32(self.scale) + offset)
@@ -0,0 +1,101 @@
+"""Background model loading with warm-up and a shared LRU cache
+
+The apps build their windows immediately and load the model on a worker
+thread: the load itself, the heavy ultralytics/torch imports and one warm-up
+inference all happen off the UI thread. Loaded models are cached by path and
+file mtime, so picking the same weights again is instant and a changed file is
+reloaded.
+"""
+import os
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+import numpy as np
+
+import backends
+
+
+def warm_up(model, imgsz=backends.IMGSZ):
+    """Run one throwaway inference so the first real call does not pay setup costs"""
+    model(np.full((imgsz, imgsz, 3), 114, dtype=np.uint8), imgsz=imgsz, verbose=False)
+
+
+class ModelManager:
+    """Load models once, keep the `max_models` most recently used ones"""
+
+    def __init__(self, max_models=3):
+        self.max_models = max_models
+        self.models = OrderedDict()
+        self.pending = {}
+        self.lock = Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+
+    def _key(self, path, int8):
+        if int8 is None:
+            int8 = os.environ.get("PLATE_INT8", "0") == "1"
+        path = os.path.realpath(path)
+        return path, os.path.getmtime(path), bool(int8)
+
+    def load_async(self, path, int8=None):
+        """Return a Future for the model; resolved immediately when it is cached
+
+        A missing or unreadable file fails the Future instead of raising here,
+        so callers report it through the same path as any other load error.
+        """
+        try:
+            key = self._key(path, int8)
+        except OSError as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+        with self.lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+                future = Future()
+                future.set_result(self.models[key])
+                return future
+            if key in self.pending:
+                return self.pending[key]
+            future = self.executor.submit(self._load, key)
+            self.pending[key] = future
+            return future
+
+    def get(self, path, int8=None):
+        """Blocking variant of load_async"""
+        return self.load_async(path, int8).result()
+
+    def _load(self, key):
+        path, _, int8 = key
+        try:
+            model = backends.load_model(path, int8=int8)
+            warm_up(model)
+        except Exception:
+            with self.lock:
+                self.pending.pop(key, None)
+            raise
+        with self.lock:
+            self.pending.pop(key, None)
+            self.models[key] = model
+            self.models.move_to_end(key)
+            while len(self.models) > self.max_models:
+                self.models.popitem(last=False)
+        return model
+
+
+def when_ready(root, future, on_ready, on_error=None, interval_ms=50):
+    """Call on_ready(model) on the Tk thread once `future` resolves (polled with after())"""
+    def poll():
+        if not future.done():
+            root.after(interval_ms, poll)
+            return
+        error = future.exception()
+        if error is None:
+            on_ready(future.result())
+        elif on_error is not None:
+            on_error(error)
+    poll()
+
+
+# Shared by every app in the process
+manager = ModelManager()
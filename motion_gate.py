@@ -0,0 +1,82 @@
+"""Skip inference on frames where nothing moves
+
+Frames are downscaled to a small grayscale image and compared with a running
+background average. Inference only runs when enough of the picture differs
+from the background, so an empty lane costs one tiny resize per frame.
+"""
+import cv2
+import numpy as np
+
+# Fraction of changed pixels needed to open the gate at sensitivity 0
+MAX_CHANGED_FRACTION = 0.05
+
+
+class MotionGate:
+    """Decide per frame whether the scene changed enough to run the model
+
+    sensitivity: 0..1, higher opens the gate on smaller changes (1 disables gating)
+    width: width of the downscaled comparison image
+    alpha: background adaptation rate; stopped objects fade into the background
+    pixel_threshold: gray-level difference counted as a changed pixel
+    max_skip: force an inference after this many skipped frames (None for never)
+    """
+
+    def __init__(self, sensitivity=0.5, width=160, alpha=0.05, pixel_threshold=25, max_skip=150):
+        self.sensitivity = sensitivity
+        self.width = width
+        self.alpha = alpha
+        self.pixel_threshold = pixel_threshold
+        self.max_skip = max_skip
+        self.background = None
+        self.small = None
+        self.gray = None
+        self.diff = None
+        self.background_u8 = None
+        self.skipped_run = 0
+        self.frames = 0
+        self.skipped = 0
+
+    def reset(self):
+        self.background = None
+        self.skipped_run = 0
+        self.frames = 0
+        self.skipped = 0
+
+    def update(self, frame):
+        """Feed a BGR frame; returns True when the model should run on it"""
+        self.frames += 1
+        height, width = frame.shape[:2]
+        size = (self.width, max(1, round(height * self.width / width)))
+        if self.background is None or self.background.shape[::-1] != size:
+            self.small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self.gray = np.empty((size[1], size[0]), dtype=np.uint8)
+            self.diff = np.empty_like(self.gray)
+            self.background_u8 = np.empty_like(self.gray)
+            cv2.resize(frame, size, dst=self.small, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+            self.background = self.gray.astype(np.float32)
+            self.skipped_run = 0
+            return True
+
+        cv2.resize(frame, size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        cv2.convertScaleAbs(self.background, dst=self.background_u8)
+        cv2.absdiff(self.gray, self.background_u8, dst=self.diff)
+        cv2.accumulateWeighted(self.gray, self.background, self.alpha)
+
+        if self.sensitivity >= 1.0:
+            moving = True
+        else:
+            cv2.threshold(self.diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self.diff)
+            changed = cv2.countNonZero(self.diff)
+            moving = changed > MAX_CHANGED_FRACTION * (1.0 - self.sensitivity) * self.diff.size
+
+        if moving or (self.max_skip is not None and self.skipped_run >= self.max_skip):
+            self.skipped_run = 0
+            return True
+        self.skipped_run += 1
+        self.skipped += 1
+        return False
+
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
@@ -0,0 +1,428 @@
+"""Read plates from many video files or camera streams across a process pool
+
+test_video.py handles a single capture. This scheduler handles a whole site of
+lanes instead:
+
+    python multi_stream.py lane1.mp4 lane2.mp4 rtsp://cam3/stream 0 --workers 4 -o reads.jsonl
+
+Each worker process loads its own model. First every stream is probed: a few
+frames are decoded and inferred to measure its cost, which is the decode plus
+inference seconds per frame times the source frame rate. Streams are then
+sharded longest-processing-time first, so each stream goes to the worker with
+the least load so far. Within a worker, the frames of all its streams that need
+inference go through the model as one batch per round. Each stream keeps its
+own motion gate and plate tracker, as in test_video.py. Per-stream and total
+FPS are printed every few seconds and again when the run ends.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import traceback
+from threading import Thread
+
+import cv2
+import numpy as np
+
+import detections
+import plate_assembly
+import plate_format
+import plate_store
+from motion_gate import MotionGate
+from plate_dedup import PlateDeduper
+from plate_tracker import PlateTracker
+from result_writer import ResultWriter
+from video_pipeline import LatestSlot
+
+FIELDS = ["stream", "source", "track_id", "plate", "plate_valid", "wilaya", "frames", "first_frame", "last_frame"]
+PROBE_FRAMES = 5
+DEFAULT_FPS = 25.0
+
+
+def open_source(source):
+    """cv2.VideoCapture for a file, URL or camera index ("0")"""
+    return cv2.VideoCapture(int(source) if source.isdigit() else source)
+
+
+def is_live(source, cap):
+    # Cameras and network streams have no frame count; they are read latest-frame-wins
+    return source.isdigit() or cap.get(cv2.CAP_PROP_FRAME_COUNT) <= 0
+
+
+def probe(model, source, conf, frames=PROBE_FRAMES):
+    """Measure what one stream costs: per-frame decode + inference time and frame rate"""
+    cap = open_source(source)
+    if not cap.isOpened():
+        return {"error": f"cannot open {source}", "cost": 0.0}
+    fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    info = {"fps": fps, "live": is_live(source, cap),
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        ret, image = cap.read()
+        if not ret:
+            break
+        model(image, conf=conf, verbose=False)
+        times.append(time.perf_counter() - start)
+    cap.release()
+    if not times:
+        return {"error": f"no frames from {source}", "cost": 0.0}
+    info["frame_ms"] = float(np.median(times)) * 1000
+    # Compute-seconds needed per second of video
+    info["cost"] = info["frame_ms"] / 1000 * fps
+    return info
+
+
+def shard(costs, workers):
+    """Longest-processing-time first: the costliest stream goes to the least loaded worker
+
+    Returns ({stream_id: worker}, per-worker load)
+    """
+    loads = [0.0] * workers
+    assignment = {}
+    for stream_id in sorted(costs, key=costs.get, reverse=True):
+        worker = int(np.argmin(loads))
+        assignment[stream_id] = worker
+        loads[worker] += costs[stream_id]
+    return assignment, loads
+
+
+class Stream:
+    """One capture inside a worker, with its own motion gate and tracker"""
+
+    def __init__(self, stream_id, source, num_classes):
+        self.stream_id = stream_id
+        self.source = source
+        self.cap = open_source(source)
+        self.live = is_live(source, self.cap)
+        self.gate = MotionGate()
+        self.tracker = PlateTracker(num_classes)
+        self.last_dets = None
+        self.frames = 0
+        self.inferred = 0
+        self.ended = not self.cap.isOpened()
+        self.start = time.perf_counter()
+        self.slot = None
+        if self.live and not self.ended:
+            # Live sources are decoded on their own thread so a slow round drops stale frames
+            self.slot = LatestSlot()
+            Thread(target=self._read_live, daemon=True).start()
+
+    def _read_live(self):
+        while not self.ended:
+            ret, image = self.cap.read()
+            if not ret:
+                break
+            self.slot.put(image)
+        self.slot.close()
+
+    def next_frame(self):
+        """Next frame to process, or None when none is ready (sets `ended` at end of stream)"""
+        if self.ended:
+            return None
+        if self.slot is not None:
+            image = self.slot.get(timeout=0)
+            if image is None and self.slot.closed:
+                self.ended = True
+            return image
+        ret, image = self.cap.read()
+        if not ret:
+            self.ended = True
+            return None
+        return image
+
+    def stats(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {"stream": self.stream_id, "source": self.source, "frames": self.frames,
+                "inferred": self.inferred, "fps": round(self.frames / elapsed, 1), "ended": self.ended}
+
+    def close(self):
+        self.ended = True
+        self.cap.release()
+
+
+def worker_main(worker_id, model_path, inbox, outbox, track_conf, threads):
+    """Worker process: probe streams on request, then run its shard until told to stop
+
+    Any failure is reported to the parent as ("error", worker_id, message)
+    instead of leaving it waiting for a message that never comes.
+    """
+    try:
+        _worker_loop(worker_id, model_path, inbox, outbox, track_conf, threads)
+    except BaseException as e:
+        traceback.print_exc()
+        outbox.put(("error", worker_id, f"{type(e).__name__}: {e}"))
+
+
+def _worker_loop(worker_id, model_path, inbox, outbox, track_conf, threads):
+    # Split the cores between workers instead of letting every runtime grab all of them
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    cv2.setNumThreads(1)
+    import backends
+    import model_manager
+    model = backends.load_model(model_path)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    model_manager.warm_up(model)
+    chars = plate_assembly.class_chars(model.names)
+    none_class_idx = detections.find_none_class(model.names)
+    outbox.put(("ready", worker_id, None))
+
+    streams = {}
+    last_stats = time.perf_counter()
+    while True:
+        try:
+            message = inbox.get() if not streams else inbox.get_nowait()
+        except queue.Empty:
+            message = None
+        if message is not None:
+            kind, stream_id, source = message
+            if kind == "probe":
+                outbox.put(("probe", stream_id, probe(model, source, detections.RAW_CONF)))
+            elif kind == "add":
+                streams[stream_id] = Stream(stream_id, source, len(chars))
+            elif kind == "stop":
+                break
+            continue
+
+        # One round: a frame from every stream, inferred together as one batch
+        pending = []
+        for stream in list(streams.values()):
+            image = stream.next_frame()
+            if image is None:
+                if stream.ended:
+                    for read in stream.tracker.flush(chars):
+                        outbox.put(("read", stream.stream_id, read._asdict()))
+                    outbox.put(("done", stream.stream_id, stream.stats()))
+                    stream.close()
+                    del streams[stream.stream_id]
+                continue
+            stream.frames += 1
+            moving = stream.gate.update(image)
+            if stream.last_dets is not None and (not moving or stream.tracker.skip_inference()):
+                continue  # Static scene or converged plates: nothing new to read
+            pending.append((stream, image))
+
+        if not pending:
+            time.sleep(0.002)
+        else:
+            results = model([image for _, image in pending], conf=detections.RAW_CONF, verbose=False)
+            for (stream, _), result in zip(pending, results):
+                stream.inferred += 1
+                dets = detections.from_result(result)
+                stream.last_dets = dets
+                tracked = detections.select(dets, detections.keep_mask(dets, track_conf, none_class_idx))
+                for read in stream.tracker.update(tracked, chars, stream.frames):
+                    outbox.put(("read", stream.stream_id, read._asdict()))
+
+        now = time.perf_counter()
+        if now - last_stats >= 1.0:
+            last_stats = now
+            outbox.put(("stats", worker_id, [s.stats() for s in streams.values()]))
+
+    for stream in streams.values():
+        for read in stream.tracker.flush(chars):
+            outbox.put(("read", stream.stream_id, read._asdict()))
+        outbox.put(("done", stream.stream_id, stream.stats()))
+        stream.close()
+    outbox.put(("exit", worker_id, None))
+
+
+def read_row(stream_id, source, read):
+    plate_check = plate_format.check(read["text"], read["conf"])
+    return {"stream": stream_id, "source": source, "track_id": read["track_id"], "plate": read["text"],
+            "plate_valid": plate_check.valid, "wilaya": plate_check.wilaya_name, "frames": read["frames"],
+            "first_frame": read["first_frame"], "last_frame": read["last_frame"]}
+
+
+def emit_read(stream_id, source, read, writer=None, store=None, deduper=None):
+    if deduper is not None and deduper.is_duplicate(read["text"], source):
+        return
+    row = read_row(stream_id, source, read)
+    print(json.dumps(row, ensure_ascii=False))
+    if writer is not None:
+        writer.write(row)
+    if store is not None:
+        store.add(read["text"], read["conf"], source, read["box"], frames=read["frames"])
+
+
+def print_stats(stream_stats, elapsed):
+    total = sum(s["frames"] for s in stream_stats.values())
+    lines = [f"{'stream':<8}{'fps':>8}{'frames':>9}{'inferred':>10}  source"]
+    for stream_id in sorted(stream_stats):
+        s = stream_stats[stream_id]
+        lines.append(f"{stream_id:<8}{s['fps']:>8}{s['frames']:>9}{s['inferred']:>10}  {s['source']}")
+    lines.append(f"total: {total / max(elapsed, 1e-9):.1f} FPS over {len(stream_stats)} streams")
+    print("\n".join(lines), file=sys.stderr)
+
+
+def poll(outbox, procs, workers, timeout=0.5):
+    """Next message from the workers, or None after `timeout`
+
+    A worker in `workers` whose process has exited is reported as an
+    ("error", worker_id, reason) message, so a crash cannot leave the caller
+    waiting forever.
+    """
+    try:
+        return outbox.get(timeout=timeout)
+    except queue.Empty:
+        pass
+    for worker in sorted(workers):
+        if not procs[worker].is_alive():
+            return ("error", worker, f"process exited with code {procs[worker].exitcode}")
+    return None
+
+
+def run(sources, model_path="best_yolo11n_none.pt", workers=None, conf=0.5, output=None, stats_interval=5.0,
+        store_path=None, dedup_window=120.0):
+    """Probe, shard and run `sources`; returns the final per-stream stats"""
+    workers = max(1, min(workers or os.cpu_count() or 1, len(sources)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    ctx = multiprocessing.get_context("spawn")
+    inboxes = [ctx.Queue() for _ in range(workers)]
+    outbox = ctx.Queue()
+    procs = [ctx.Process(target=worker_main, args=(w, model_path, inboxes[w], outbox, conf, threads),
+                         daemon=True) for w in range(workers)]
+    for proc in procs:
+        proc.start()
+
+    writer = ResultWriter(output, FIELDS) if output else None
+    store = plate_store.PlateStore(store_path) if store_path else None
+    deduper = PlateDeduper(window=dedup_window) if dedup_window > 0 else None
+    stream_stats = {}
+    alive = set(range(workers))
+    start = time.perf_counter()
+
+    def worker_failed(worker, reason):
+        # True the first time a worker is reported dead (its own error message and the liveness check may both fire)
+        if worker not in alive:
+            return False
+        alive.discard(worker)
+        print(f"worker {worker} failed: {reason}", file=sys.stderr)
+        return True
+
+    try:
+        ready = set()
+        while not alive <= ready:
+            message = poll(outbox, procs, alive)
+            if message is None:
+                continue
+            kind, worker, payload = message
+            if kind == "ready":
+                ready.add(worker)
+            elif kind == "error":
+                worker_failed(worker, payload)
+        if not alive:
+            raise RuntimeError("no worker could load the model")
+
+        # Probe in parallel, round-robin over the workers
+        live = sorted(alive)
+        prober = {}
+        for stream_id, source in enumerate(sources):
+            prober[stream_id] = live[stream_id % len(live)]
+            inboxes[prober[stream_id]].put(("probe", stream_id, source))
+        probes = {}
+        while len(probes) < len(sources):
+            message = poll(outbox, procs, alive)
+            if message is None:
+                continue
+            kind, key, info = message
+            if kind == "probe":
+                probes[key] = info
+                if "error" in info:
+                    print(f"Skipping stream {key}: {info['error']}", file=sys.stderr)
+            elif kind == "error" and worker_failed(key, info):
+                for stream_id, worker in prober.items():
+                    if worker == key and stream_id not in probes:
+                        probes[stream_id] = {"error": f"worker {key} failed"}
+                        print(f"Skipping stream {stream_id}: worker {key} failed", file=sys.stderr)
+        if not alive:
+            raise RuntimeError("every worker failed while probing")
+
+        costs = {sid: info["cost"] for sid, info in probes.items() if "error" not in info}
+        live = sorted(alive)
+        slots, loads = shard(costs, len(live))
+        assignment = {sid: live[slot] for sid, slot in slots.items()}
+        for slot, w in enumerate(live):
+            shard_ids = [sid for sid, worker in assignment.items() if worker == w]
+            print(f"worker {w}: streams {shard_ids} load {loads[slot]:.2f}", file=sys.stderr)
+        for stream_id, worker in assignment.items():
+            inboxes[worker].put(("add", stream_id, sources[stream_id]))
+
+        start = time.perf_counter()
+        last_print = start
+        remaining = set(assignment)
+        while remaining:
+            message = poll(outbox, procs, alive)
+            kind, key, payload = message if message is not None else (None, None, None)
+            if kind == "read":
+                emit_read(key, sources[key], payload, writer, store, deduper)
+            elif kind == "stats":
+                for s in payload:
+                    stream_stats[s["stream"]] = s
+            elif kind == "done":
+                stream_stats[key] = payload
+                remaining.discard(key)
+            elif kind == "error" and worker_failed(key, payload):
+                lost = {sid for sid in remaining if assignment[sid] == key}
+                if lost:
+                    print(f"Dropping streams {sorted(lost)} of worker {key}", file=sys.stderr)
+                remaining -= lost
+            if time.perf_counter() - last_print >= stats_interval:
+                last_print = time.perf_counter()
+                print_stats(stream_stats, last_print - start)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for inbox in inboxes:
+            inbox.put(("stop", None, None))
+        # Drain the final reads of live streams that were still running
+        exited = set()
+        deadline = time.perf_counter() + 10.0
+        while not alive <= exited and time.perf_counter() < deadline:
+            message = poll(outbox, procs, alive - exited)
+            if message is None:
+                continue
+            kind, key, payload = message
+            if kind in ("exit", "error"):
+                exited.add(key)
+            elif kind == "done":
+                stream_stats[key] = payload
+            elif kind == "read":
+                emit_read(key, sources[key], payload, writer, store, deduper)
+        for proc in procs:
+            proc.join(timeout=1.0)
+        if writer is not None:
+            writer.close()
+        if store is not None:
+            store.close()
+    if stream_stats:
+        print_stats(stream_stats, time.perf_counter() - start)
+    return stream_stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-stream plate reading on a process pool")
+    parser.add_argument("sources", nargs="+", help="video files, stream URLs or camera indices")
+    parser.add_argument("--model", default="best_yolo11n_none.pt")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--conf", type=float, default=0.5, help="confidence used for tracking")
+    parser.add_argument("-o", "--output", help="also write the plate reads to this .jsonl/.csv file")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="seconds between FPS reports")
+    parser.add_argument("--store", help="also keep the plate reads in this plate_store database")
+    parser.add_argument("--dedup-window", type=float, default=120.0,
+                        help="seconds during which a repeated read of a plate on the same stream is dropped (0 = off)")
+    args = parser.parse_args(argv)
+    run(args.sources, args.model, args.workers, args.conf, args.output, args.stats_interval, args.store,
+        args.dedup_window)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Draw detections straight into a reusable display buffer
+
+result.plot() builds an annotator for each frame, copies the image and
+rasterizes every label with putText. Here the frame is copied (or
+channel-swapped) once into a preallocated buffer, in the color order the
+display wants. Box outlines are drawn with cv2.rectangle. Each label is a
+bitmap rendered the first time its class is drawn at a given line width and
+then pasted with one slice assignment. The assembled plate string is drawn
+the same way, from a small cache keyed by its text.
+
+    renderer = OverlayRenderer(model.names, rgb=True)
+    shown = renderer.render(frame, dets, plate_text="12345 116 16")
+"""
+import cv2
+import numpy as np
+
+# ultralytics' default palette (RGB), so colors match result.plot()
+PALETTE = ("042AFF", "0BDBEB", "F3F3F3", "00DFB7", "111F68", "FF6FDD", "FF444F", "CCED00", "00F344", "BD00FF",
+           "00B4FF", "DD00BA", "00FFFF", "26C000", "01FFB3", "7D24FF", "7B0068", "FF1B6C", "FC6D2F", "A2FF0B")
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+MAX_CACHED_PLATES = 64
+
+
+def line_width(shape):
+    """Box outline width for an image, as result.plot() picks it"""
+    return max(round(sum(shape[:2]) / 2 * 0.003), 2)
+
+
+def render_label(text, background, line_w, rgb=True):
+    """Filled label patch: `text` on `background` (RGB, or BGR unless `rgb`), with black or white ink by brightness"""
+    font_scale = line_w / 3
+    thickness = max(line_w - 1, 1)
+    (width, height), _ = cv2.getTextSize(text, FONT, font_scale, thickness)
+    pad = max(line_w // 2, 1)
+    patch = np.empty((height + 2 * pad + line_w, width + 2 * pad, 3), dtype=np.uint8)
+    patch[:] = background
+    red, green, blue = background if rgb else background[::-1]
+    luma = 0.299 * red + 0.587 * green + 0.114 * blue
+    ink = (0, 0, 0) if luma > 150 else (255, 255, 255)
+    cv2.putText(patch, text, (pad, pad + height), FONT, font_scale, ink, thickness, cv2.LINE_AA)
+    return patch
+
+
+class OverlayRenderer:
+    """Render frames with their detections into preallocated buffers
+
+    `class_names` is the model's {index: name} map. With `rgb` the output is
+    RGB (for PIL / Tk), otherwise BGR (for cv2 and FramePresenter). A ring of
+    `buffers` output arrays is cycled through. Use more than one when another
+    thread may still be reading the previous frame while the next one is drawn.
+    """
+
+    def __init__(self, class_names, rgb=False, buffers=1):
+        self.class_names = dict(class_names)
+        self.rgb = rgb
+        self.colors = {}
+        for idx in self.class_names:
+            r, g, b = (int(PALETTE[idx % len(PALETTE)][i:i + 2], 16) for i in (0, 2, 4))
+            self.colors[idx] = (r, g, b) if rgb else (b, g, r)
+        self.buffers = [None] * max(1, buffers)
+        self.next_buffer = 0
+        self.glyphs = {}
+        self.plates = {}
+
+    def render(self, image, dets, plate_text=None):
+        """Copy of BGR `image` with `dets` (pixel coordinates of `image`) drawn on it; returns the buffer"""
+        out = self._buffer(image.shape)
+        if self.rgb:
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=out)
+        else:
+            np.copyto(out, image)
+        height, width = out.shape[:2]
+        line_w = line_width(out.shape)
+        boxes = np.round(dets.xyxy).astype(np.int32)
+        np.clip(boxes[:, 0::2], 0, width - 1, out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, height - 1, out=boxes[:, 1::2])
+        for (x1, y1, x2, y2), cls in zip(boxes.tolist(), dets.cls.tolist()):
+            color = self.colors.get(cls, (255, 255, 255))
+            cv2.rectangle(out, (x1, y1), (x2, y2), color, line_w)
+            glyph = self._glyph(cls, line_w)
+            # Above the box when it fits, otherwise just inside its top edge
+            top = y1 - glyph.shape[0] if y1 >= glyph.shape[0] else y1
+            self._paste(out, glyph, x1, top)
+        if plate_text:
+            glyph = self._plate(plate_text, line_w)
+            self._paste(out, glyph, 0, height - glyph.shape[0])
+        return out
+
+    def _buffer(self, shape):
+        shape = (*shape[:2], 3)
+        out = self.buffers[self.next_buffer]
+        if out is None or out.shape != shape:
+            out = self.buffers[self.next_buffer] = np.empty(shape, dtype=np.uint8)
+        self.next_buffer = (self.next_buffer + 1) % len(self.buffers)
+        return out
+
+    def _glyph(self, cls, line_w):
+        key = (cls, line_w)
+        glyph = self.glyphs.get(key)
+        if glyph is None:
+            name = self.class_names.get(cls, str(cls))
+            glyph = self.glyphs[key] = render_label(name, self.colors.get(cls, (255, 255, 255)), line_w, self.rgb)
+        return glyph
+
+    def _plate(self, text, line_w):
+        key = (text, line_w)
+        glyph = self.plates.get(key)
+        if glyph is None:
+            if len(self.plates) >= MAX_CACHED_PLATES:
+                self.plates.clear()
+            glyph = self.plates[key] = render_label(text, (0, 0, 0), line_w * 2, self.rgb)
+        return glyph
+
+    @staticmethod
+    def _paste(out, glyph, x, y):
+        height, width = out.shape[:2]
+        x, y = max(0, x), max(0, y)
+        h, w = min(glyph.shape[0], height - y), min(glyph.shape[1], width - x)
+        if h > 0 and w > 0:
+            out[y:y + h, x:x + w] = glyph[:h, :w]
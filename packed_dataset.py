@@ -0,0 +1,148 @@
+"""Pack a YOLO-format split into one memory-mapped shard
+
+Each image is decoded once at pack time and stored as raw uint8 BGR. It can be
+letterboxed to --size x --size (the default 640, the model input) or kept at
+full resolution with --size 0. The shard is a directory:
+
+    images.bin     all pixels back to back
+    index.npy      (N, 5) int64: byte offset, height, width, first label row, label count
+    labels.npy     (M, 5) float32: cls, cx, cy, w, h, normalized to the stored image
+    geometry.npy   (N, 6) float32: original width, height, x/y scale and x/y padding of the letterbox
+    meta.json      class names, source split, image names
+
+PackedDataset memory-maps these files. image(i) and labels(i) are views into
+the maps: nothing is decoded or copied, and the OS page cache serves
+repeated runs.
+
+    python packed_dataset.py --data matricule_number_detection-1/data.yaml --split val -o packs/val
+    python evaluate.py --weights best.pt --packed packs/val
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import detections
+import yolo_dataset
+from batch_predict import start_prefetch
+from letterbox import Letterbox
+
+
+def pack(data, split, out_dir, size=640, prefetch=64, workers=4):
+    """Decode (and letterbox) every image of `split` into a shard at `out_dir`; returns the image count"""
+    _, names = yolo_dataset.read_data_yaml(data)
+    paths = yolo_dataset.list_images(yolo_dataset.split_dir(data, split))
+    os.makedirs(out_dir, exist_ok=True)
+    letterbox = Letterbox(size) if size else None
+
+    index, geometry, label_rows, kept = [], [], [], []
+    offset = label_start = 0
+    with open(os.path.join(out_dir, "images.bin"), "wb") as f:
+        # start_prefetch may finish files out of order; the index records whatever order they arrive in
+        for path, image in start_prefetch(paths, prefetch, workers):
+            if image is None:
+                print(f"Skipping unreadable {path}", file=sys.stderr)
+                continue
+            labels = yolo_dataset.read_labels(yolo_dataset.label_path(path)).copy()
+            height, width = image.shape[:2]
+            if letterbox is not None:
+                stored = letterbox.apply(image)
+                sx = letterbox.region[2] / width
+                sy = letterbox.region[3] / height
+                pad_x, pad_y = letterbox.pad
+                labels[:, 1] = (labels[:, 1] * width * sx + pad_x) / size
+                labels[:, 2] = (labels[:, 2] * height * sy + pad_y) / size
+                labels[:, 3] *= width * sx / size
+                labels[:, 4] *= height * sy / size
+            else:
+                stored = np.ascontiguousarray(image if image.ndim == 3 else cv2.cvtColor(image, cv2.COLOR_GRAY2BGR))
+                sx = sy = 1.0
+                pad_x = pad_y = 0
+            f.write(stored.data)
+            index.append((offset, stored.shape[0], stored.shape[1], label_start, len(labels)))
+            geometry.append((width, height, sx, sy, pad_x, pad_y))
+            label_rows.append(labels)
+            kept.append(os.path.basename(path))
+            offset += stored.nbytes
+            label_start += len(labels)
+
+    np.save(os.path.join(out_dir, "index.npy"), np.array(index, dtype=np.int64).reshape(-1, 5))
+    np.save(os.path.join(out_dir, "geometry.npy"), np.array(geometry, dtype=np.float32).reshape(-1, 6))
+    labels = np.concatenate(label_rows) if label_rows else np.zeros((0, 5), dtype=np.float32)
+    np.save(os.path.join(out_dir, "labels.npy"), labels.astype(np.float32))
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"names": {str(k): v for k, v in names.items()}, "source": os.path.abspath(data), "split": split,
+                   "size": size, "images": kept}, f, indent=1)
+    return len(kept)
+
+
+class PackedDataset:
+    """Zero-copy reader for a shard written by pack()"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.names = {int(k): v for k, v in self.meta["names"].items()}
+        self.image_names = self.meta["images"]
+        self.index = np.load(os.path.join(path, "index.npy"), mmap_mode="r")
+        self.geometry = np.load(os.path.join(path, "geometry.npy"), mmap_mode="r")
+        self.label_array = np.load(os.path.join(path, "labels.npy"), mmap_mode="r")
+        images_path = os.path.join(path, "images.bin")
+        if os.path.getsize(images_path):
+            self.pixels = np.memmap(images_path, dtype=np.uint8, mode="r")
+        else:
+            self.pixels = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.index)
+
+    def image(self, i):
+        """Read-only (H, W, 3) view of image i"""
+        offset, height, width = (int(v) for v in self.index[i, :3])
+        return self.pixels[offset:offset + height * width * 3].reshape(height, width, 3)
+
+    def labels(self, i):
+        """(K, 5) view of image i's labels, normalized to the stored image"""
+        start, count = (int(v) for v in self.index[i, 3:5])
+        return self.label_array[start:start + count]
+
+    def detections(self, i):
+        """Ground truth of image i as pixel-space Detections in stored-image coordinates"""
+        _, height, width = (int(v) for v in self.index[i, :3])
+        return yolo_dataset.labels_to_detections(np.asarray(self.labels(i)), width, height)
+
+    def to_original(self, i, dets):
+        """Map Detections on stored image i back to the original image's pixel coordinates"""
+        _, _, sx, sy, pad_x, pad_y = (float(v) for v in self.geometry[i])
+        xyxy = (dets.xyxy - np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)) / np.array(
+            [sx, sy, sx, sy], dtype=np.float32)
+        return detections.Detections(xyxy, dets.cls, dets.conf)
+
+    def samples(self, limit=None):
+        """Yield (name, image view, ground truth) for evaluation loops"""
+        for i in range(len(self) if limit is None else min(limit, len(self))):
+            yield self.image_names[i], self.image(i), self.detections(i)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack a YOLO-format split into a memory-mapped shard")
+    parser.add_argument("--data", required=True, help="data.yaml of the dataset")
+    parser.add_argument("--split", default="val")
+    parser.add_argument("-o", "--output", required=True, help="shard directory to create")
+    parser.add_argument("--size", type=int, default=640, help="letterbox size (0 = keep full resolution)")
+    parser.add_argument("--workers", type=int, default=4, help="decoder threads")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    count = pack(args.data, args.split, args.output, args.size, workers=args.workers)
+    size_mb = os.path.getsize(os.path.join(args.output, "images.bin")) / 1e6
+    print(f"Packed {count} images ({size_mb:.0f} MB) into {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Per-stage timing with rolling histograms, an FPS overlay and Prometheus export
+
+The apps wrap their stages (decode, letterbox, filter, plot, display) in
+timer.stage(name). The ultralytics preprocess/inference/postprocess split comes
+from result.speed through add_speed(). Timing is off by default. When it is
+disabled, stage() returns one shared no-op context manager and the other calls
+return immediately, so the cost is one attribute check per stage.
+
+    PLATE_TIMING=1             collect stage timings
+    PLATE_TIMING_OVERLAY=1     draw FPS and per-stage latency on the displayed frame
+    PLATE_METRICS_FILE=path    rewrite a Prometheus text file every few seconds
+                               (e.g. for the node_exporter textfile collector)
+    PLATE_METRICS_PORT=9108    serve the same metrics on http://127.0.0.1:<port>/metrics
+
+Both export options turn timing on. The apps start the export with
+timer.start_export() when they launch; importing the module has no side effects.
+"""
+import os
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+import cv2
+import numpy as np
+
+# Histogram bucket upper bounds in seconds for the exported (cumulative) histograms
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+WRITE_INTERVAL = 5.0
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class StageTimer:
+    """Thread-safe stage timings: a rolling window per stage plus cumulative histograms"""
+
+    def __init__(self, enabled=False, overlay=False, window=256):
+        self.enabled = enabled
+        self.overlay = overlay
+        self.window = window
+        self.lock = Lock()
+        self.rings = {}
+        self.counts = {}
+        self.sums = {}
+        self.buckets = {}
+        self.frame_times = deque(maxlen=window)
+        self.server = None
+        self.exporting = False
+
+    @classmethod
+    def from_env(cls):
+        metrics_file = os.environ.get("PLATE_METRICS_FILE")
+        metrics_port = os.environ.get("PLATE_METRICS_PORT")
+        enabled = os.environ.get("PLATE_TIMING", "0") == "1" or bool(metrics_file) or bool(metrics_port)
+        return cls(enabled, overlay=os.environ.get("PLATE_TIMING_OVERLAY", "0") == "1")
+
+    def start_export(self):
+        """Start the exports requested by PLATE_METRICS_FILE / PLATE_METRICS_PORT
+
+        Called from the apps' entry points rather than at import, so processes
+        that only import the module (e.g. spawned workers) neither bind the
+        port nor overwrite the file.
+        """
+        if self.exporting:
+            return
+        self.exporting = True
+        metrics_file = os.environ.get("PLATE_METRICS_FILE")
+        metrics_port = os.environ.get("PLATE_METRICS_PORT")
+        if metrics_file:
+            self.start_file_export(metrics_file)
+        if metrics_port:
+            self.serve(int(metrics_port))
+
+    def stage(self, name):
+        """Context manager timing one stage; a shared no-op when disabled"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def add(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            ring = self.rings.get(name)
+            if ring is None:
+                ring = self.rings[name] = np.zeros(self.window)
+                self.counts[name] = 0
+                self.sums[name] = 0.0
+                self.buckets[name] = np.zeros(len(BUCKETS) + 1, dtype=np.int64)
+            ring[self.counts[name] % self.window] = seconds
+            self.counts[name] += 1
+            self.sums[name] += seconds
+            self.buckets[name][np.searchsorted(BUCKETS, seconds)] += 1
+
+    def add_speed(self, result):
+        """Record the preprocess/inference/postprocess split ultralytics stores in result.speed (ms)"""
+        if not self.enabled:
+            return
+        for name in ("preprocess", "inference", "postprocess"):
+            ms = (result.speed or {}).get(name)
+            if ms is not None:
+                self.add(name, ms / 1000)
+
+    def frame_done(self):
+        """Mark one displayed frame, for the FPS figure"""
+        if not self.enabled:
+            return
+        self.frame_times.append(time.perf_counter())
+
+    def fps(self):
+        times = list(self.frame_times)
+        if len(times) < 2:
+            return 0.0
+        return (len(times) - 1) / max(times[-1] - times[0], 1e-9)
+
+    def summary(self):
+        """Rolling-window latency per stage: {name: {count, p50_ms, p95_ms, p99_ms, mean_ms}}"""
+        with self.lock:
+            windows = {name: ring[:min(self.counts[name], self.window)].copy() for name, ring in self.rings.items()}
+            counts = dict(self.counts)
+        stats = {}
+        for name, values in windows.items():
+            ms = values * 1000
+            p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+            stats[name] = {"count": counts[name], "p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2),
+                           "p99_ms": round(float(p99), 2), "mean_ms": round(float(ms.mean()), 2)}
+        return stats
+
+    def draw_overlay(self, frame, rgb=False):
+        """Draw FPS and per-stage p50/p95 in the top-left corner of a BGR (or, with `rgb`, RGB) frame, in place"""
+        if not (self.enabled and self.overlay) or frame is None:
+            return frame
+        lines = [f"FPS {self.fps():.1f}"]
+        lines += [f"{name} {s['p50_ms']:.1f}/{s['p95_ms']:.1f} ms" for name, s in self.summary().items()]
+        scale = max(0.4, frame.shape[0] / 1000)
+        step = int(22 * scale / 0.5)
+        yellow = (255, 255, 0) if rgb else (0, 255, 255)
+        for i, line in enumerate(lines):
+            y = step * (i + 1)
+            cv2.putText(frame, line, (8, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), 3, cv2.LINE_AA)
+            cv2.putText(frame, line, (8, y), cv2.FONT_HERSHEY_SIMPLEX, scale, yellow, 1, cv2.LINE_AA)
+        return frame
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            names = sorted(self.counts)
+            counts = dict(self.counts)
+            sums = dict(self.sums)
+            buckets = {name: self.buckets[name].copy() for name in names}
+        lines = ["# HELP plate_stage_seconds Time spent per processing stage",
+                 "# TYPE plate_stage_seconds histogram"]
+        for name in names:
+            cumulative = np.cumsum(buckets[name])
+            for bound, count in zip(BUCKETS, cumulative):
+                lines.append(f'plate_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'plate_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {counts[name]}')
+            lines.append(f'plate_stage_seconds_sum{{stage="{name}"}} {sums[name]:.6f}')
+            lines.append(f'plate_stage_seconds_count{{stage="{name}"}} {counts[name]}')
+        lines += ["# HELP plate_stage_p95_seconds Rolling-window 95th percentile per stage",
+                  "# TYPE plate_stage_p95_seconds gauge"]
+        for name, s in self.summary().items():
+            lines.append(f'plate_stage_p95_seconds{{stage="{name}"}} {s["p95_ms"] / 1000:.6f}')
+        lines += ["# HELP plate_fps Displayed frames per second", "# TYPE plate_fps gauge",
+                  f"plate_fps {self.fps():.3f}"]
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        # Write then rename so a scraper never reads a half-written file
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    def start_file_export(self, path, interval=WRITE_INTERVAL):
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_file(path)
+                except OSError as e:
+                    print(f"Could not write metrics to {path}: {e}")
+
+        Thread(target=loop, daemon=True, name="metrics-file").start()
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics on a background thread"""
+        timer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = timer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        Thread(target=self.server.serve_forever, daemon=True, name="metrics-http").start()
+        return self.server
+
+
+# Shared by every app and pipeline stage in the process
+timer = StageTimer.from_env()
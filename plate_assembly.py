@@ -0,0 +1,88 @@
+"""Turn per-digit detections into a plate string
+
+Everything works on the NumPy arrays from detections.from_result, without
+building per-box Python objects, so assembly stays cheap even with dense
+detections.
+"""
+import numpy as np
+from collections import namedtuple
+
+# text: assembled plate string, conf: per-character confidence,
+# index: position of each character's box in the input detections, rows: 1 or 2
+PlateRead = namedtuple("PlateRead", ["text", "conf", "index", "rows"])
+
+# A vertical gap larger than this fraction of the median box height starts a second row
+ROW_GAP_RATIO = 0.6
+# Boxes in the same row overlapping horizontally by more than this fraction are duplicates
+DUPLICATE_OVERLAP = 0.6
+
+
+def class_chars(class_names):
+    """Build a lookup array mapping class index to its plate character
+
+    Only digit classes are plate characters; every other class ("none",
+    "back", ...) maps to '' and is ignored when assembling.
+    """
+    size = max(class_names) + 1 if class_names else 0
+    chars = np.full(size, "", dtype=object)
+    for idx, name in class_names.items():
+        if name.isdigit():
+            chars[idx] = name
+    return chars
+
+
+def empty_read():
+    return PlateRead("", np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64), 0)
+
+
+def split_rows(cy, h):
+    """Assign each box to row 0 (top) or 1 (bottom) using the largest vertical gap"""
+    rows = np.zeros(len(cy), dtype=np.int64)
+    if len(cy) < 2:
+        return rows
+    sorted_cy = np.sort(cy)
+    gaps = np.diff(sorted_cy)
+    k = int(np.argmax(gaps))
+    if gaps[k] > ROW_GAP_RATIO * float(np.median(h)):
+        rows[cy > sorted_cy[k]] = 1
+    return rows
+
+
+def assemble(dets, chars):
+    """Assemble a plate string from detections
+
+    `chars` is the lookup built by class_chars. Boxes of non-digit classes
+    ("none", "back") are dropped, the rest are split into one or two rows and read top row first,
+    left to right. Overlapping boxes in the same row keep the more confident one.
+    """
+    cls = dets.cls
+    if len(cls) == 0:
+        return empty_read()
+    known = cls < len(chars)
+    keep = np.flatnonzero(known)
+    keep = keep[chars[cls[keep]] != ""]
+    if len(keep) == 0:
+        return empty_read()
+
+    xyxy = dets.xyxy[keep]
+    conf = dets.conf[keep]
+    cx = (xyxy[:, 0] + xyxy[:, 2]) * 0.5
+    cy = (xyxy[:, 1] + xyxy[:, 3]) * 0.5
+    w = xyxy[:, 2] - xyxy[:, 0]
+    h = xyxy[:, 3] - xyxy[:, 1]
+
+    rows = split_rows(cy, h)
+    order = np.lexsort((cx, rows))
+
+    if len(order) > 1:
+        # Compare each box with its right-hand neighbour in reading order
+        a, b = order[:-1], order[1:]
+        overlap = np.minimum(xyxy[a, 2], xyxy[b, 2]) - np.maximum(xyxy[a, 0], xyxy[b, 0])
+        dup = (rows[a] == rows[b]) & (overlap > DUPLICATE_OVERLAP * np.minimum(w[a], w[b]))
+        if dup.any():
+            drop = np.where(conf[a] < conf[b], a, b)[dup]
+            order = order[~np.isin(order, drop)]
+
+    index = keep[order]
+    text = "".join(chars[cls[index]].tolist())
+    return PlateRead(text, conf[order], index, int(rows.max()) + 1)
@@ -0,0 +1,120 @@
+"""Suppress repeated reads of the same plate from the same source
+
+A car waiting at a barrier is read again and again. A plate counts as a repeat
+if a read of it came from the same source less than `window` seconds ago.
+Reads up to `max_distance` (0 or 1) edits apart count as the same plate, so
+one misread digit does not produce a new event. A repeat refreshes the entry,
+so the plate stays suppressed for as long as it keeps being seen.
+
+Fuzzy lookups use a symmetric deletion index: every plate is registered under
+itself and each of its one-character deletions. Two strings within one edit
+share at least one of those keys. A lookup therefore costs O(plate length)
+dict operations whatever the cache size, and the candidates are then checked
+exactly. Entries expire after `window` seconds, and at most `max_entries` are
+kept (least recently seen first out), so memory stays flat over long uptimes.
+"""
+import time
+from collections import OrderedDict
+
+
+def normalize(plate):
+    """Canonical form used as the key: alphanumerics only, upper case"""
+    return "".join(ch for ch in plate if ch.isalnum()).upper()
+
+
+def deletions(text):
+    """`text` and every string obtained by deleting one character from it"""
+    return {text} | {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+def within_one_edit(a, b):
+    """True when a and b differ by at most one substitution, insertion or deletion"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+
+class PlateDeduper:
+    """Bounded TTL/LRU cache of recently emitted plates, keyed by (source, plate)"""
+
+    def __init__(self, window=120.0, max_entries=10000, max_distance=1, clock=time.monotonic):
+        self.window = window
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.clock = clock
+        # (source, plate) -> last seen, oldest first
+        self.entries = OrderedDict()
+        # (source, deletion key) -> plates registered under it
+        self.index = {}
+        self.suppressed = 0
+
+    def is_duplicate(self, plate, source=None, now=None):
+        """Register a read; True if the same (or a one-edit) plate was seen from `source` within the window"""
+        plate = normalize(plate)
+        if not plate:
+            return False
+        now = self.clock() if now is None else now
+        self._expire(now)
+
+        variants = deletions(plate) if self.max_distance else ()
+        match = self._lookup(plate, source, variants)
+        if match is not None:
+            # Keep suppressing for as long as the plate stays in view
+            self.entries[match] = now
+            self.entries.move_to_end(match)
+            self.suppressed += 1
+            return True
+
+        key = (source, plate)
+        self.entries[key] = now
+        for variant in variants:
+            self.index.setdefault((source, variant), set()).add(plate)
+        while len(self.entries) > self.max_entries:
+            oldest, _ = self.entries.popitem(last=False)
+            self._evict(oldest)
+        return False
+
+    def _lookup(self, plate, source, variants):
+        if (source, plate) in self.entries:
+            return (source, plate)
+        for variant in variants:
+            for candidate in self.index.get((source, variant), ()):
+                if within_one_edit(plate, candidate):
+                    return (source, candidate)
+        return None
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self.entries:
+            key, seen = next(iter(self.entries.items()))
+            if seen >= cutoff:
+                break
+            del self.entries[key]
+            self._evict(key)
+
+    def _evict(self, key):
+        if not self.max_distance:
+            return
+        source, plate = key
+        for variant in deletions(plate):
+            bucket = self.index.get((source, variant))
+            if bucket is not None:
+                bucket.discard(plate)
+                if not bucket:
+                    del self.index[(source, variant)]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.index.clear()
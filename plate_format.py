@@ -0,0 +1,136 @@
+"""Algerian plate layout checks and wilaya decoding
+
+A DZ plate reads  SSSSS TYY WW :
+    SSSSS  serial number (5 or 6 digits)
+    T      vehicle type (1-9)
+    YY     year of first registration
+    WW     wilaya code (01-58)
+
+All lookups go through tables built once at import time so checking a read
+costs a few array lookups.
+"""
+import numpy as np
+from collections import namedtuple
+
+SERIAL_LENGTHS = (5, 6)
+PLATE_LENGTHS = tuple(n + 5 for n in SERIAL_LENGTHS)
+MAX_SUGGESTIONS = 3
+# Only the least confident digits are tried as substitution candidates
+SUGGEST_POSITIONS = 3
+
+WILAYAS = (
+    "Adrar", "Chlef", "Laghouat", "Oum El Bouaghi", "Batna", "Bejaia", "Biskra",
+    "Bechar", "Blida", "Bouira", "Tamanrasset", "Tebessa", "Tlemcen", "Tiaret",
+    "Tizi Ouzou", "Alger", "Djelfa", "Jijel", "Setif", "Saida", "Skikda",
+    "Sidi Bel Abbes", "Annaba", "Guelma", "Constantine", "Medea", "Mostaganem",
+    "M'Sila", "Mascara", "Ouargla", "Oran", "El Bayadh", "Illizi",
+    "Bordj Bou Arreridj", "Boumerdes", "El Tarf", "Tindouf", "Tissemsilt",
+    "El Oued", "Khenchela", "Souk Ahras", "Tipaza", "Mila", "Ain Defla", "Naama",
+    "Ain Temouchent", "Ghardaia", "Relizane", "Timimoun", "Bordj Badji Mokhtar",
+    "Ouled Djellal", "Beni Abbes", "In Salah", "In Guezzam", "Touggourt", "Djanet",
+    "El M'Ghair", "El Meniaa",
+)
+
+VEHICLE_TYPES = {
+    1: "Passenger car",
+    2: "Truck",
+    3: "Van",
+    4: "Bus",
+    5: "Road tractor",
+    6: "Other tractor",
+    7: "Special vehicle",
+    8: "Trailer",
+    9: "Motorcycle",
+}
+
+# Two-digit code -> wilaya name (None for codes that are not assigned)
+WILAYA_TABLE = (None,) + WILAYAS + (None,) * (99 - len(WILAYAS))
+_VALID_WILAYA = np.array([name is not None for name in WILAYA_TABLE])
+_VALID_TYPE = np.array([d in VEHICLE_TYPES for d in range(10)])
+_DIGITS = np.arange(10)
+
+PlateCheck = namedtuple(
+    "PlateCheck",
+    ["valid", "serial", "vehicle_type", "year", "wilaya", "wilaya_name", "errors", "suggestions"],
+)
+
+
+def _valid_rows(digits):
+    """Vectorized layout check over an (M, L) array of candidate digit rows"""
+    n = digits.shape[1]
+    if n not in PLATE_LENGTHS:
+        return np.zeros(len(digits), dtype=bool)
+    return _VALID_TYPE[digits[:, n - 5]] & _VALID_WILAYA[digits[:, n - 2] * 10 + digits[:, n - 1]]
+
+
+def _suggest(digits, conf):
+    """Suggest near-miss corrections, most likely first, as (text, score) pairs
+
+    A digit's score is 1 - its confidence, i.e. how likely it is to be the misread one.
+    """
+    n = len(digits)
+    doubt = 1.0 - np.asarray(conf, dtype=np.float32)
+    if n in PLATE_LENGTHS:
+        positions = np.argsort(-doubt)[:SUGGEST_POSITIONS]
+        candidates = np.repeat(digits[None, :], len(positions) * 10, axis=0)
+        pos = np.repeat(positions, 10)
+        candidates[np.arange(len(pos)), pos] = np.tile(_DIGITS, len(positions))
+        scores = doubt[pos]
+    elif n - 1 in PLATE_LENGTHS:
+        # One extra digit, most often a duplicate box: try dropping each one
+        keep = ~np.eye(n, dtype=bool)
+        candidates = np.broadcast_to(digits, (n, n))[keep].reshape(n, n - 1)
+        scores = doubt
+    else:
+        return ()
+    ok = np.flatnonzero(_valid_rows(candidates) & (scores > 0))
+    ok = ok[np.argsort(-scores[ok], kind="stable")][:MAX_SUGGESTIONS]
+    return tuple(
+        ("".join(map(str, candidates[i].tolist())), round(float(scores[i]), 3))
+        for i in ok
+    )
+
+
+def check(text, conf=None):
+    """Validate a plate string against the DZ layout and decode its fields
+
+    `conf` holds per-character confidences (as returned by plate_assembly);
+    when given, invalid reads come with suggested corrections.
+    """
+    errors = []
+    if not text:
+        return PlateCheck(False, None, None, None, None, None, ("empty read",), ())
+    if not text.isdigit():
+        return PlateCheck(False, None, None, None, None, None, ("non-digit characters",), ())
+
+    digits = np.frombuffer(text.encode("ascii"), dtype=np.uint8).astype(np.int64) - 48
+    n = len(digits)
+    if n not in PLATE_LENGTHS:
+        errors.append(f"expected {' or '.join(map(str, PLATE_LENGTHS))} digits, got {n}")
+        serial = vehicle_type = year = wilaya = wilaya_name = None
+    else:
+        serial = text[:n - 5]
+        vehicle_type = int(digits[n - 5])
+        year = text[n - 4:n - 2]
+        wilaya = text[n - 2:]
+        wilaya_name = WILAYA_TABLE[int(wilaya)]
+        if not _VALID_TYPE[vehicle_type]:
+            errors.append(f"unknown vehicle type {vehicle_type}")
+        if wilaya_name is None:
+            errors.append(f"unknown wilaya code {wilaya}")
+
+    suggestions = ()
+    if errors and conf is not None and len(conf) == n:
+        suggestions = _suggest(digits, conf)
+    return PlateCheck(not errors, serial, vehicle_type, year, wilaya, wilaya_name, tuple(errors), suggestions)
+
+
+def describe(text, result):
+    """One-line human-readable summary of a check, for display in the apps"""
+    if result.valid:
+        return (f"{result.serial} {result.vehicle_type}{result.year} {result.wilaya}  "
+                f"{result.wilaya_name} - {VEHICLE_TYPES[result.vehicle_type]}")
+    line = f"{text or '-'}  invalid: {'; '.join(result.errors)}"
+    if result.suggestions:
+        line += "  (try " + ", ".join(s for s, _ in result.suggestions) + ")"
+    return line
@@ -0,0 +1,199 @@
+"""Local HTTP plate-reading service with dynamic micro-batching
+
+Concurrent requests are grouped into one model call, with at most max_batch
+images per call. The scheduler waits at most max_wait_ms for a batch to fill
+after its first request arrives.
+
+    python plate_service.py --port 8765 --max-batch 8 --max-wait-ms 10
+
+    POST /predict   body: encoded image bytes (JPEG/PNG)
+                    -> {"plate": ..., "plate_valid": ..., "detections": [...], ...}
+    GET  /health    -> {"status": "ok", "requests": ..., "batches": ...}
+
+A local client is included for offline testing and load generation:
+
+    python plate_service.py --client photos/*.jpg --concurrency 16
+"""
+import argparse
+import json
+import queue
+import sys
+import time
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import cv2
+import numpy as np
+
+import detections
+import model_manager
+import plate_assembly
+from batch_predict import collect_paths, plate_record
+
+REQUEST_TIMEOUT = 30.0
+
+
+class MicroBatcher:
+    """Collect concurrent images into batched model calls on one worker thread"""
+
+    def __init__(self, model, max_batch=8, max_wait_ms=10.0, conf=0.5, imgsz=640):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.conf = conf
+        self.imgsz = imgsz
+        self.class_names = model.names
+        self.chars = plate_assembly.class_chars(self.class_names)
+        self.queue = queue.Queue()
+        self.requests = 0
+        self.batches = 0
+        self.worker = Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, image):
+        """Queue an image; returns a Future resolving to its plate record"""
+        future = Future()
+        self.queue.put((image, future))
+        return future
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.model([image for image, _ in batch], conf=self.conf, imgsz=self.imgsz,
+                                     verbose=False)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.requests += len(batch)
+            self.batches += 1
+            for (_, future), result in zip(batch, results):
+                # One bad item fails its own request, not the batcher thread
+                try:
+                    record = plate_record(detections.from_result(result), self.chars, self.class_names)
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+                record["batch_size"] = len(batch)
+                future.set_result(record)
+
+
+def make_handler(batcher):
+    class PlateHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                self._send_json(404, {"error": "not found"})
+                return
+            self._send_json(200, {
+                "status": "ok",
+                "requests": batcher.requests,
+                "batches": batcher.batches,
+                "mean_batch": round(batcher.requests / max(batcher.batches, 1), 2),
+            })
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            data = np.frombuffer(self.rfile.read(length), dtype=np.uint8)
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR) if length else None
+            if image is None:
+                self._send_json(400, {"error": "body is not a decodable image"})
+                return
+            start = time.perf_counter()
+            try:
+                record = batcher.submit(image).result(timeout=REQUEST_TIMEOUT)
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            record["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            self._send_json(200, record)
+
+        def log_message(self, format, *args):
+            pass  # Per-request logging would dominate at high request rates
+
+    return PlateHandler
+
+
+def serve(model_path, host="127.0.0.1", port=8765, max_batch=8, max_wait_ms=10.0, conf=0.5):
+    model = model_manager.manager.get(model_path)
+    batcher = MicroBatcher(model, max_batch, max_wait_ms, conf)
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    server.daemon_threads = True
+    print(f"Serving {model_path} on http://{host}:{port} (max batch {max_batch}, max wait {max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def predict_file(path, url="http://127.0.0.1:8765"):
+    """Client helper: send one image file to the service and return the decoded response"""
+    with open(path, "rb") as f:
+        body = f.read()
+    request = urllib.request.Request(url + "/predict", data=body, method="POST",
+                                     headers={"Content-Type": "application/octet-stream"})
+    with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+        return json.loads(response.read())
+
+
+def run_client(paths, url, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for path, reply in zip(paths, pool.map(lambda p: predict_file(p, url), paths)):
+            print(json.dumps({"path": path, "plate": reply["plate"], "plate_valid": reply["plate_valid"],
+                              "batch_size": reply["batch_size"], "latency_ms": reply["latency_ms"]}))
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths)} requests in {elapsed:.2f}s ({len(paths) / max(elapsed, 1e-9):.1f} req/s)",
+          file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-batching plate reading service")
+    parser.add_argument("--model", default="best_yolo11n_none.pt")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--client", nargs="+", metavar="IMAGE", help="send images to a running service instead")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel client requests")
+    args = parser.parse_args(argv)
+
+    if args.client:
+        run_client(collect_paths(args.client), f"http://{args.host}:{args.port}", args.concurrency)
+    else:
+        serve(args.model, args.host, args.port, args.max_batch, args.max_wait_ms, args.conf)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""Persistent, indexed store for plate reads (SQLite in WAL mode)
+
+Each read keeps its plate string, per-digit confidences, timestamp, source,
+box, the number of frames it was voted over, and the wilaya decoded by
+plate_format. Writes are queued and committed by a background thread in bulk
+transactions, so add() never blocks the UI or inference threads on disk I/O.
+
+Indexes used by the searches:
+
+    plate          prefix search      starts_with("12345")
+    reversed plate suffix search      ends_with("16")      (the wilaya is the last two digits)
+    wilaya         exact wilaya code  by_wilaya("16")
+    n-gram keys    substring/wildcard search("12?45"), where "?" matches any one digit
+
+The n-gram keys of a plate are its trigrams plus its 4-character windows with
+one inner gap ("12?4", "2?45"). A pattern with a single wildcard therefore
+still has keys with three known digits to look up.
+
+    python plate_store.py plate_reads.db --search "12?45"
+    python plate_store.py plate_reads.db --wilaya 16 --limit 20
+"""
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import time
+from threading import Thread
+
+import plate_format
+
+DEFAULT_PATH = "plate_reads.db"
+WILDCARD = "?"
+# Patterns without any index key get wildcards expanded over the plate
+# alphabet (digits), at most this many of them
+MAX_EXPANDED_WILDCARDS = 2
+PLATE_ALPHABET = "0123456789"
+# A failed write transaction is retried after this many seconds; on close(), at most CLOSE_ATTEMPTS times
+RETRY_INTERVAL = 0.5
+CLOSE_ATTEMPTS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reads (
+    id INTEGER PRIMARY KEY,
+    plate TEXT NOT NULL,
+    plate_rev TEXT NOT NULL,
+    wilaya TEXT,
+    valid INTEGER NOT NULL,
+    conf TEXT,
+    mean_conf REAL,
+    ts REAL NOT NULL,
+    source TEXT,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+    frames INTEGER
+);
+CREATE INDEX IF NOT EXISTS reads_plate ON reads (plate);
+CREATE INDEX IF NOT EXISTS reads_plate_rev ON reads (plate_rev);
+CREATE INDEX IF NOT EXISTS reads_wilaya ON reads (wilaya, ts);
+CREATE INDEX IF NOT EXISTS reads_ts ON reads (ts);
+CREATE TABLE IF NOT EXISTS plate_grams (
+    gram TEXT NOT NULL,
+    read_id INTEGER NOT NULL,
+    PRIMARY KEY (gram, read_id)
+) WITHOUT ROWID;
+"""
+COLUMNS = ["id", "plate", "wilaya", "valid", "conf", "mean_conf", "ts", "source", "x1", "y1", "x2", "y2", "frames"]
+_STOP = object()
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def index_keys(text):
+    """Trigrams and single-gap 4-grams of a plate string"""
+    keys = {text[i:i + 3] for i in range(len(text) - 2)}
+    for i in range(len(text) - 3):
+        window = text[i:i + 4]
+        keys.add(window[0] + WILDCARD + window[2:])
+        keys.add(window[:2] + WILDCARD + window[3])
+    return keys
+
+
+def pattern_keys(pattern):
+    """Index keys every plate containing `pattern` must have"""
+    keys = set()
+    for i in range(len(pattern) - 2):
+        window = pattern[i:i + 3]
+        if WILDCARD not in window:
+            keys.add(window)
+    for i in range(len(pattern) - 3):
+        window = pattern[i:i + 4]
+        if window.count(WILDCARD) == 1 and window[0] != WILDCARD and window[3] != WILDCARD:
+            keys.add(window)
+    return keys
+
+
+def expand(pattern, alphabet=PLATE_ALPHABET, max_wildcards=MAX_EXPANDED_WILDCARDS):
+    """Replace wildcards (leftmost first) with each character of `alphabet` until every variant has index keys
+
+    Returns None when that would take more than `max_wildcards` expansions.
+    """
+    variants = [pattern]
+    for _ in range(max_wildcards + 1):
+        if all(pattern_keys(v) for v in variants):
+            return variants
+        if WILDCARD not in variants[0]:
+            return None
+        variants = [v.replace(WILDCARD, ch, 1) for v in variants for ch in alphabet]
+    return None
+
+
+def _prefix_range(prefix):
+    # [prefix, prefix + U+10FFFF) covers every string starting with prefix and can use the index
+    return prefix, prefix + "\U0010ffff"
+
+
+class PlateStore:
+    """Buffered writer plus indexed queries over the reads table
+
+    add() enqueues; a writer thread commits up to `batch_size` reads per
+    transaction, or whatever has arrived after `flush_interval` seconds. A
+    batch whose transaction fails stays queued and is retried.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, batch_size=500, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = connect(path)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.queue = queue.Queue()
+        self.writer = Thread(target=self._write_loop, daemon=True, name="plate-store")
+        self.writer.start()
+
+    def add(self, plate, conf=None, source=None, box=None, ts=None, frames=1):
+        """Queue one read; `conf` is the per-digit confidence sequence, `box` an xyxy sequence"""
+        self.queue.put((plate, conf, source, box, time.time() if ts is None else ts, frames))
+
+    def add_read(self, read, source=None, ts=None):
+        """Queue a plate_tracker.TrackRead"""
+        self.add(read.text, read.conf, source, read.box, ts, read.frames)
+
+    def flush(self):
+        """Block until everything queued so far is committed"""
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.writer.join()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_loop(self):
+        conn = connect(self.path)
+        # Reads whose transaction failed (e.g. another writer held the lock); kept and retried
+        pending = []
+        stopping = False
+        while not stopping:
+            try:
+                items = [self.queue.get(timeout=RETRY_INTERVAL if pending else None)]
+            except queue.Empty:
+                items = []
+            deadline = time.perf_counter() + self.flush_interval
+            while items and len(items) < self.batch_size and items[-1] is not _STOP:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if items and items[-1] is _STOP:
+                stopping = True
+                items.pop()
+            pending.extend(items)
+            attempts = CLOSE_ATTEMPTS if stopping else 1
+            for attempt in range(attempts):
+                if self._commit(conn, pending):
+                    break
+                if attempt + 1 < attempts:
+                    time.sleep(RETRY_INTERVAL)
+            else:
+                if not stopping:
+                    continue
+                print(f"Giving up on {len(pending)} plate reads")
+            for _ in pending:
+                self.queue.task_done()
+            pending = []
+        self.queue.task_done()  # The stop marker
+        conn.close()
+
+    def _commit(self, conn, items):
+        """Insert queued reads and their n-gram keys in one transaction; False if it failed"""
+        if not items:
+            return True
+        try:
+            with conn:
+                gram_rows = []
+                for plate, conf, source, box, ts, frames in items:
+                    check = plate_format.check(plate)
+                    conf = [round(float(c), 4) for c in conf] if conf is not None else None
+                    box = [float(v) for v in box] if box is not None else [None] * 4
+                    # SQLite assigns the id, so several stores can share one file
+                    cursor = conn.execute(
+                        f"INSERT INTO reads (plate, plate_rev, wilaya, valid, conf, mean_conf, ts, source,"
+                        f" x1, y1, x2, y2, frames) VALUES ({', '.join('?' * 13)})",
+                        (plate, plate[::-1], check.wilaya, int(check.valid),
+                         json.dumps(conf) if conf is not None else None,
+                         round(sum(conf) / len(conf), 4) if conf else None, ts, source, *box, frames))
+                    gram_rows.extend((key, cursor.lastrowid) for key in index_keys(plate))
+                gram_rows.sort()  # Sorted keys append to the index B-tree instead of splitting random pages
+                conn.executemany("INSERT OR IGNORE INTO plate_grams (gram, read_id) VALUES (?, ?)", gram_rows)
+            return True
+        except sqlite3.Error as e:
+            print(f"Could not store {len(items)} plate reads, will retry: {e}")
+            return False
+
+    def _select(self, where, params, limit, source="reads", order="ts DESC"):
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM {source} WHERE {where} ORDER BY {order} LIMIT ?", (*params, limit))
+        rows = []
+        for values in cursor:
+            row = dict(zip(COLUMNS, values))
+            row["conf"] = json.loads(row["conf"]) if row["conf"] else None
+            row["valid"] = bool(row["valid"])
+            rows.append(row)
+        return rows
+
+    def starts_with(self, prefix, limit=100):
+        return self._select("plate >= ? AND plate < ?", _prefix_range(prefix), limit)
+
+    def ends_with(self, suffix, limit=100):
+        return self._select("plate_rev >= ? AND plate_rev < ?", _prefix_range(suffix[::-1]), limit)
+
+    def by_wilaya(self, code, limit=100):
+        return self._select("wilaya = ?", (f"{int(code):02d}",), limit)
+
+    def recent(self, limit=100):
+        return self._select("1", (), limit)
+
+    def search(self, pattern, limit=100):
+        """Newest reads containing `pattern` anywhere; "?" stands for exactly one character
+
+        The rarest index key of the pattern drives the query. Its postings are
+        walked newest-first through the (gram, read_id) key, and GLOB checks
+        each candidate until `limit` rows match. Patterns with no key of their
+        own are expanded over the digits first ("1??45" -> "10?45" ... "19?45")
+        and the per-variant results are merged. Only patterns that still have
+        no key fall back to a full scan.
+        """
+        glob = "*" + pattern.replace("[", "[[]").replace("*", "[*]") + "*"
+        variants = expand(pattern)
+        if variants is None:
+            return self._select("plate GLOB ?", (glob,), limit, order="id DESC")
+        rows = {}
+        for variant in variants:
+            driver = min(pattern_keys(variant), key=self._postings)
+            for row in self._select("plate_grams.gram = ? AND plate GLOB ?", (driver, glob), limit,
+                                    source="plate_grams JOIN reads ON reads.id = plate_grams.read_id",
+                                    order="plate_grams.read_id DESC"):
+                rows[row["id"]] = row
+        return [rows[i] for i in sorted(rows, reverse=True)[:limit]]
+
+    def _postings(self, gram):
+        return self.conn.execute("SELECT COUNT(*) FROM plate_grams WHERE gram = ?", (gram,)).fetchone()[0]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM reads").fetchone()[0]
+
+
+def open_default():
+    """The store the apps write to: $PLATE_STORE, or plate_reads.db in the working directory"""
+    return PlateStore(os.environ.get("PLATE_STORE", DEFAULT_PATH))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the plate read store")
+    parser.add_argument("db", nargs="?", default=os.environ.get("PLATE_STORE", DEFAULT_PATH))
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--search", help='substring pattern, "?" matches one digit (e.g. 12?45)')
+    group.add_argument("--prefix", help="plates starting with this")
+    group.add_argument("--suffix", help="plates ending with this")
+    group.add_argument("--wilaya", type=int, help="plates registered in this wilaya code")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    store = PlateStore(args.db)
+    start = time.perf_counter()
+    if args.search:
+        rows = store.search(args.search, args.limit)
+    elif args.prefix:
+        rows = store.starts_with(args.prefix, args.limit)
+    elif args.suffix:
+        rows = store.ends_with(args.suffix, args.limit)
+    elif args.wilaya is not None:
+        rows = store.by_wilaya(args.wilaya, args.limit)
+    else:
+        rows = store.recent(args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False))
+    print(f"{len(rows)} rows in {elapsed:.1f} ms ({store.count()} reads stored)")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
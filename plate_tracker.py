@@ -0,0 +1,210 @@
+"""Track plates across video frames and vote on their characters
+
+Digit boxes are grouped into plate clusters, clusters are matched to tracks by
+IoU (falling back to centroid distance), and every track accumulates
+confidence-weighted votes per character position. When a track ends, a single
+read is emitted from the votes instead of one slightly different string per
+frame.
+"""
+import numpy as np
+from collections import namedtuple
+
+import detections
+import plate_assembly
+
+# A finished track: its final read, per-character vote share and lifetime
+TrackRead = namedtuple("TrackRead", ["track_id", "text", "conf", "frames", "first_frame", "last_frame", "box"])
+
+# Boxes belong to the same plate when their gap is below these fractions of the box height
+CLUSTER_GAP_X = 1.0
+CLUSTER_GAP_Y = 1.5
+
+
+def box_iou(a, b):
+    """IoU matrix between (N, 4) and (M, 4) xyxy arrays"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def cluster_boxes(xyxy):
+    """Label connected groups of nearby boxes; returns one cluster id per box"""
+    n = len(xyxy)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    h = xyxy[:, 3] - xyxy[:, 1]
+    ref = np.maximum(h[:, None], h[None, :])
+    gap_x = np.maximum(xyxy[:, None, 0], xyxy[None, :, 0]) - np.minimum(xyxy[:, None, 2], xyxy[None, :, 2])
+    gap_y = np.abs((xyxy[:, None, 1] + xyxy[:, None, 3]) - (xyxy[None, :, 1] + xyxy[None, :, 3])) * 0.5
+    adjacent = (gap_x < CLUSTER_GAP_X * ref) & (gap_y < CLUSTER_GAP_Y * ref)
+
+    # Propagate the smallest index through the adjacency until stable
+    labels = np.arange(n)
+    while True:
+        spread = np.where(adjacent, labels[None, :], n).min(axis=1)
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+    return np.unique(labels, return_inverse=True)[1]
+
+
+class Track:
+    def __init__(self, track_id, box, frame_index, num_classes):
+        self.track_id = track_id
+        self.box = box
+        self.first_frame = frame_index
+        self.last_frame = frame_index
+        self.frames = 0
+        self.missed = 0
+        self.num_classes = num_classes
+        self.votes = {}  # plate length -> (length, num_classes) confidence sums
+        self.converged = False
+
+    def add(self, cls, conf):
+        length = len(cls)
+        if length == 0:
+            return
+        if length not in self.votes:
+            self.votes[length] = np.zeros((length, self.num_classes), dtype=np.float32)
+        self.votes[length][np.arange(length), cls] += conf
+        self.frames += 1
+
+    def best(self):
+        """Winning class per position and the vote share each one received"""
+        if not self.votes:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        length = max(self.votes, key=lambda n: self.votes[n].sum() / n)
+        votes = self.votes[length]
+        cls = votes.argmax(axis=1)
+        share = votes[np.arange(length), cls] / np.maximum(votes.sum(axis=1), 1e-9)
+        return cls, share
+
+
+class PlateTracker:
+    """Multi-frame plate tracker with per-character voting
+
+    iou_threshold: minimum IoU to match a cluster to a track
+    max_distance: fallback match when centroids are closer than this many track widths
+    max_missed: inferred frames without a match before a track ends
+    min_votes / converge_share: a track has converged once it has min_votes reads
+        and every position's winning character holds at least converge_share of the votes
+    recheck_interval: while every track has converged, run inference only on
+        every recheck_interval-th frame to notice tracks ending
+    """
+
+    def __init__(self, num_classes, iou_threshold=0.3, max_distance=0.5, max_missed=10,
+                 min_votes=5, converge_share=0.8, recheck_interval=10):
+        self.num_classes = num_classes
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.min_votes = min_votes
+        self.converge_share = converge_share
+        self.recheck_interval = recheck_interval
+        self.tracks = []
+        self.next_id = 1
+        self.skipped = 0
+
+    def reset(self):
+        self.tracks = []
+        self.skipped = 0
+
+    def skip_inference(self):
+        """True while every live track has converged, except on periodic recheck frames"""
+        if not self.tracks or not all(t.converged for t in self.tracks):
+            self.skipped = 0
+            return False
+        self.skipped += 1
+        if self.skipped >= self.recheck_interval:
+            self.skipped = 0
+            return False
+        return True
+
+    def update(self, dets, chars, frame_index):
+        """Feed one inferred frame's detections; returns the TrackReads of tracks that ended"""
+        keep = np.flatnonzero(dets.cls < len(chars))
+        keep = keep[chars[dets.cls[keep]] != ""]
+        dets = detections.select(dets, keep)
+        labels = cluster_boxes(dets.xyxy)
+        num_clusters = int(labels.max()) + 1 if len(labels) else 0
+        boxes = np.zeros((num_clusters, 4), dtype=np.float32)
+        if num_clusters:
+            boxes[:, :2] = np.inf
+            np.minimum.at(boxes[:, 0], labels, dets.xyxy[:, 0])
+            np.minimum.at(boxes[:, 1], labels, dets.xyxy[:, 1])
+            np.maximum.at(boxes[:, 2], labels, dets.xyxy[:, 2])
+            np.maximum.at(boxes[:, 3], labels, dets.xyxy[:, 3])
+
+        matches = self._match(boxes)
+        matched_clusters = set()
+        for t, c in matches:
+            track = self.tracks[t]
+            track.box = boxes[c]
+            track.last_frame = frame_index
+            track.missed = 0
+            matched_clusters.add(c)
+            if not track.converged:
+                self._vote(track, detections.select(dets, labels == c), chars)
+
+        matched_tracks = {t for t, _ in matches}
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+
+        for c in range(num_clusters):
+            if c not in matched_clusters:
+                track = Track(self.next_id, boxes[c], frame_index, self.num_classes)
+                self.next_id += 1
+                self._vote(track, detections.select(dets, labels == c), chars)
+                self.tracks.append(track)
+
+        ended = [t for t in self.tracks if t.missed > self.max_missed]
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        return [r for r in (self._final(t, chars) for t in ended) if r is not None]
+
+    def flush(self, chars):
+        """End every live track and return their reads"""
+        reads = [r for r in (self._final(t, chars) for t in self.tracks) if r is not None]
+        self.reset()
+        return reads
+
+    def _match(self, boxes):
+        if not self.tracks or not len(boxes):
+            return []
+        track_boxes = np.stack([t.box for t in self.tracks])
+        score = box_iou(track_boxes, boxes)
+        # Centroid fallback for small or fast-moving plates with little overlap
+        centers_t = (track_boxes[:, :2] + track_boxes[:, 2:]) * 0.5
+        centers_c = (boxes[:, :2] + boxes[:, 2:]) * 0.5
+        dist = np.linalg.norm(centers_t[:, None] - centers_c[None, :], axis=2)
+        width = np.maximum(track_boxes[:, 2] - track_boxes[:, 0], 1e-9)[:, None]
+        near = (score < self.iou_threshold) & (dist < self.max_distance * width)
+        score = np.where(near, self.iou_threshold, score)
+
+        matches = []
+        while True:
+            t, c = np.unravel_index(np.argmax(score), score.shape)
+            if score[t, c] < self.iou_threshold:
+                break
+            matches.append((int(t), int(c)))
+            score[t, :] = -1
+            score[:, c] = -1
+        return matches
+
+    def _vote(self, track, dets, chars):
+        read = plate_assembly.assemble(dets, chars)
+        track.add(dets.cls[read.index], read.conf)
+        if track.frames >= self.min_votes:
+            _, share = track.best()
+            track.converged = bool(len(share)) and float(share.min()) >= self.converge_share
+
+    def _final(self, track, chars):
+        cls, share = track.best()
+        if len(cls) == 0:
+            return None
+        text = "".join(chars[cls].tolist())
+        return TrackRead(track.track_id, text, share, track.frames,
+                         track.first_frame, track.last_frame, track.box.tolist())
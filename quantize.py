@@ -0,0 +1,105 @@
+"""Build an INT8 version of the plate model and compare it with FP32
+
+Calibrates a post-training INT8 OpenVINO model on the plate-digit dataset
+downloaded in plate_test_2.py, then scores both models on the same split:
+
+    box mAP50 / mAP50-95 (ultralytics val), per-digit accuracy, plate-string
+    accuracy, median latency and peak resident memory
+
+Each model is measured in its own process so memory numbers do not mix.
+
+    python quantize.py --data matricule_number_detection-1/data.yaml
+    python quantize.py --data ... --fraction 0.3 --report int8_report.json
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+
+import cv2
+import numpy as np
+
+import backends
+import detections
+import plate_assembly
+import yolo_dataset
+from evaluate import match_predictions
+
+
+def measure(weights, int8, data, split, conf, limit):
+    """Score one model variant; runs in a child process"""
+    if int8:
+        model = backends.load_model(weights, int8=True)
+    else:
+        model = backends.load_model(weights, backend="torch", int8=False)
+    _, names = yolo_dataset.read_data_yaml(data)
+    chars = plate_assembly.class_chars(names)
+    images = yolo_dataset.list_images(yolo_dataset.split_dir(data, split))[:limit]
+
+    latencies = []
+    gt_digits = matched_digits = plates_ok = plates = 0
+    for path in images:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        start = time.perf_counter()
+        result = model(image, conf=conf, verbose=False)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        pred = detections.from_result(result)
+        labels = yolo_dataset.read_labels(yolo_dataset.label_path(path))
+        gt = yolo_dataset.labels_to_detections(labels, image.shape[1], image.shape[0])
+        gt_digits += len(gt.cls)
+        # Same greedy matching as evaluate.py, at IoU 0.5 only
+        matched_digits += int(match_predictions(pred, gt, (0.5,))[:, 0].sum())
+        gt_plate = plate_assembly.assemble(gt, chars).text
+        if gt_plate:
+            plates += 1
+            plates_ok += plate_assembly.assemble(pred, chars).text == gt_plate
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    metrics = model.val(data=data, split=split, imgsz=backends.IMGSZ, batch=1, plots=False, verbose=False)
+    return {
+        "model": backends.artifact_path(weights, "openvino", True) if int8 else weights,
+        "map50": round(float(metrics.box.map50), 4),
+        "map50_95": round(float(metrics.box.map), 4),
+        "digit_accuracy": round(matched_digits / max(gt_digits, 1), 4),
+        "plate_accuracy": round(plates_ok / max(plates, 1), 4),
+        "latency_ms_p50": round(float(np.median(latencies)), 2) if latencies else None,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "images": len(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="INT8 quantization with an FP32 comparison report")
+    parser.add_argument("--data", required=True, help="data.yaml of the plate-digit dataset")
+    parser.add_argument("--weights", default="best_yolo11n_none.pt")
+    parser.add_argument("--fraction", type=float, default=0.5, help="share of the dataset used for calibration")
+    parser.add_argument("--split", default="val", help="split to score on")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--limit", type=int, default=None, help="score at most this many images")
+    parser.add_argument("--report", default="int8_report.json")
+    args = parser.parse_args(argv)
+
+    path = backends.export(args.weights, "openvino", int8=True, data=args.data, fraction=args.fraction)
+    print(f"INT8 model: {path}")
+
+    report = {}
+    ctx = multiprocessing.get_context("spawn")
+    for name, int8 in (("fp32", False), ("int8", True)):
+        with ctx.Pool(1) as pool:
+            report[name] = pool.apply(measure, (args.weights, int8, args.data, args.split, args.conf, args.limit))
+
+    keys = ["map50", "map50_95", "digit_accuracy", "plate_accuracy", "latency_ms_p50", "peak_rss_mb"]
+    print(f"{'metric':<16}{'fp32':>12}{'int8':>12}")
+    for key in keys:
+        print(f"{key:<16}{report['fp32'][key]!s:>12}{report['int8'][key]!s:>12}")
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
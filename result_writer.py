@@ -0,0 +1,43 @@
+import csv
+import json
+import os
+
+
+class ResultWriter:
+    """Stream one result row per line to a JSONL or CSV file
+
+    The format is picked from the file extension (.csv, anything else is JSONL).
+    Nested values (detection lists) are stored as JSON strings in CSV mode.
+    """
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.is_csv = os.path.splitext(path)[1].lower() == ".csv"
+        self.file = open(path, "w", newline="" if self.is_csv else None, encoding="utf-8")
+        self.rows = 0
+        if self.is_csv:
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=self.fieldnames, extrasaction="ignore")
+            self.csv_writer.writeheader()
+
+    def write(self, row):
+        if self.is_csv:
+            flat = {
+                k: json.dumps(v) if isinstance(v, (list, dict)) else v
+                for k, v in row.items()
+            }
+            self.csv_writer.writerow(flat)
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.rows += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,87 @@
+"""Run the model on a crop around the last known plate
+
+Between consecutive video frames a plate only moves a little, so after a
+full-frame detection the next frames are inferred on an expanded crop around
+the previous digit boxes at a smaller imgsz. Boxes are mapped back to
+full-frame coordinates; a full-frame pass runs periodically and whenever the
+crop loses the plate.
+"""
+import numpy as np
+
+import detections
+
+
+class RoiPredictor:
+    """Full-frame / crop inference switcher for one video stream
+
+    imgsz: model input size for crops
+    full_imgsz: model input size for full-frame passes
+    margin: crop expansion around the digit boxes, as a fraction of their extent
+    min_size: smallest crop side in pixels, so tiny plates keep some context
+    full_every: force a full-frame pass after this many crop passes
+    roi_conf: boxes at or above this confidence define the crop
+    """
+
+    def __init__(self, model, imgsz=320, full_imgsz=640, margin=0.6, min_size=160, full_every=30,
+                 roi_conf=0.25, ignore_cls=None):
+        self.model = model
+        self.imgsz = imgsz
+        self.full_imgsz = full_imgsz
+        self.margin = margin
+        self.min_size = min_size
+        self.full_every = full_every
+        self.roi_conf = roi_conf
+        self.ignore_cls = ignore_cls
+        self.roi = None
+        self.since_full = 0
+        self.crop_passes = 0
+        self.full_passes = 0
+
+    def reset(self):
+        self.roi = None
+        self.since_full = 0
+
+    def __call__(self, frame, conf):
+        """Detect on `frame`; returns a result in full-frame coordinates"""
+        if self.roi is not None and self.since_full < self.full_every:
+            x0, y0, x1, y1 = self.roi
+            crop = frame[y0:y1, x0:x1]
+            crop_result = self.model(crop, conf=conf, imgsz=self.imgsz, verbose=False)[0]
+            result = detections.remap_result(crop_result, frame, offset=(x0, y0))
+            dets = detections.from_result(result)
+            roi = self._roi(dets, frame.shape)
+            if roi is not None:
+                self.roi = roi
+                self.since_full += 1
+                self.crop_passes += 1
+                return result
+            # Plate left the crop: fall through to a full-frame pass on this frame
+
+        result = self.model(frame, conf=conf, imgsz=self.full_imgsz, verbose=False)[0]
+        self.roi = self._roi(detections.from_result(result), frame.shape)
+        self.since_full = 0
+        self.full_passes += 1
+        return result
+
+    def _roi(self, dets, shape):
+        """Expanded crop around the confident digit boxes, or None when there are none"""
+        keep = detections.keep_mask(dets, self.roi_conf, self.ignore_cls)
+        if not keep.any():
+            return None
+        xyxy = dets.xyxy[keep]
+        x0, y0 = xyxy[:, :2].min(axis=0)
+        x1, y1 = xyxy[:, 2:].max(axis=0)
+        cx, cy = (x0 + x1) * 0.5, (y0 + y1) * 0.5
+        half_w = max((x1 - x0) * (1 + 2 * self.margin), self.min_size) * 0.5
+        half_h = max((y1 - y0) * (1 + 2 * self.margin), self.min_size) * 0.5
+        height, width = shape[:2]
+        box = np.array([cx - half_w, cy - half_h, cx + half_w, cy + half_h])
+        box = np.clip(np.round(box), 0, [width, height, width, height]).astype(int)
+        if box[2] - box[0] < 2 or box[3] - box[1] < 2:
+            return None
+        return tuple(box.tolist())
+
+    def crop_ratio(self):
+        """Share of passes that ran on a crop instead of the full frame"""
+        total = self.crop_passes + self.full_passes
+        return self.crop_passes / total if total else 0.0
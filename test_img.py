@@ -1,8 +1,14 @@
-from ultralytics import YOLO
 import tkinter as tk
 from tkinter import filedialog, Label, Scale, HORIZONTAL
 from PIL import Image, ImageTk
 import numpy as np
+import detections
+import model_manager
+import overlay
+import plate_assembly
+import plate_format
+import plate_store
+from perf_timing import timer
 
 # Initialize all global variables
 scale = 1.0
@@ -11,17 +17,39 @@ img = None
 predicted_image = None
 img_label = None
 show_none = True
-
-# Load the YOLO model and get class names
-model = YOLO("best_yolo11n_none.pt")
-class_names = model.names  # Get dictionary of class names
+raw_result = None
+raw_dets = None
+raw_path = None
+# Plate reads are kept on disk (PLATE_STORE, default plate_reads.db)
+store = plate_store.open_default()
+
+# Start loading the YOLO model in the background; the window opens right away
+MODEL_PATH = "best_yolo11n_none.pt"
+model_future = model_manager.manager.load_async(MODEL_PATH)
+model = None
+class_names = {}
 none_class_idx = None
+plate_chars = None
+renderer = None
+
+def model_loaded(loaded):
+    global model, class_names, none_class_idx, plate_chars, renderer
+    model = loaded
+    class_names = model.names  # Get dictionary of class names
+
+    # Find the index of "none" class
+    none_class_idx = detections.find_none_class(class_names)
+    plate_chars = plate_assembly.class_chars(class_names)
+    # Draws boxes straight into an RGB buffer, ready for PIL
+    renderer = overlay.OverlayRenderer(class_names, rgb=True)
+
+    # Update toggle button text to show class name
+    toggle_none_btn.config(text=f"Toggle '{class_names.get(none_class_idx, 'None')}' Class")
+    predict_button.config(state="normal")
+    status_label.config(text=f"Model: {MODEL_PATH}")
 
-# Find the index of "none" class
-for idx, name in class_names.items():
-    if name.lower() == "none":
-        none_class_idx = idx
-        break
+def model_failed(error):
+    status_label.config(text=f"Failed to load model: {error}", fg="red")
 
 def zoom(event):
     global scale, img_label, img_path
@@ -50,44 +78,76 @@ def update_image(image=None):
         img_label.image = img_tk
 
 def load_image():
-    global img_label, img_path, img, scale
+    global img_label, img_path, img, scale, raw_path
     img_path = filedialog.askopenfilename(filetypes=[("Image files", "*.jpg *.jpeg *.png")])
     if img_path:
+        raw_path = None  # Drop the cached prediction of the previous image
         scale = 1.0  # Reset zoom
-        img = Image.open(img_path)
+        with timer.stage("decode"):
+            img = Image.open(img_path)
+            img.load()
         update_image(img)
 
 def toggle_none():
     global show_none, predicted_image
     show_none = not show_none
     if img_path:
-        predict()  # Re-run prediction with new visibility setting
+        predict()  # Re-filter the cached prediction with new visibility setting
+
+def conf_changed(value):
+    # Only re-filter when the current image already has a cached prediction
+    if img_path and raw_path == img_path:
+        predict()
 
 def predict():
-    global img_path, img_label, predicted_image
-    if img_path:
-        conf_threshold = float(conf_slider.get())
-        results = model(img_path, conf=conf_threshold)
-        
-        for result in results:
-            # Filter out none class if hidden
-            if not show_none and none_class_idx is not None:
-                boxes = result.boxes
-                # Keep all classes except none
-                mask = boxes.cls != none_class_idx
-                result.boxes = boxes[mask]
-            
-            plotted_image = result.plot(conf=False)
-            predicted_image = Image.fromarray(plotted_image[..., ::-1])
+    global img_path, img_label, predicted_image, raw_result, raw_dets, raw_path
+    if img_path and model is not None:
+        fresh = raw_path != img_path
+        if fresh:
+            # Run the network once per image at a low threshold; the slider
+            # and the "none" toggle only mask the cached boxes afterwards
+            raw_result = model(img_path, conf=detections.RAW_CONF)[0]
+            timer.add_speed(raw_result)
+            raw_dets = detections.from_result(raw_result)
+            raw_path = img_path
+
+        with timer.stage("filter"):
+            conf_threshold = float(conf_slider.get())
+            hidden_cls = none_class_idx if not show_none else None
+            mask = detections.keep_mask(raw_dets, conf_threshold, hidden_cls)
+            dets = detections.select(raw_dets, mask)
+
+        with timer.stage("plot"):
+            plotted_image = renderer.render(raw_result.orig_img, dets)
+        timer.draw_overlay(plotted_image, rgb=True)
+        with timer.stage("display"):
+            predicted_image = Image.fromarray(plotted_image)
             update_image(predicted_image)
+        timer.frame_done()
+        show_plate(dets, store_read=fresh)
+
+def show_plate(dets, store_read=False):
+    # Assemble the digits into a plate string and check it against the DZ layout
+    read = plate_assembly.assemble(dets, plate_chars)
+    plate_check = plate_format.check(read.text, read.conf)
+    if store_read and read.text:
+        # Only the first read of an image is stored, not every slider re-filter
+        boxes = dets.xyxy[read.index]
+        store.add(read.text, read.conf, img_path, [*boxes[:, :2].min(axis=0), *boxes[:, 2:].max(axis=0)])
+    plate_label.config(text=plate_format.describe(read.text, plate_check) if read.text else "",
+                       fg="green" if plate_check.valid else "red")
 
 def reset():
-    global img_label, img_path, predicted_image, scale
+    global img_label, img_path, predicted_image, scale, raw_result, raw_dets, raw_path
     img_label.config(image="")
     img_label.image = None
     img_path = None
     predicted_image = None
+    raw_result = None
+    raw_dets = None
+    raw_path = None
     scale = 1.0
+    plate_label.config(text="")
 
 # Create Tkinter interface
 root = tk.Tk()
@@ -96,7 +156,8 @@ root.title("YOLO Model Tester")
 # Add confidence threshold slider
 conf_label = tk.Label(root, text="Confidence Threshold:")
 conf_label.pack()
-conf_slider = Scale(root, from_=0.0, to=1.0, resolution=0.05, orient=HORIZONTAL)
+conf_slider = Scale(root, from_=detections.RAW_CONF, to=1.0, resolution=0.05, orient=HORIZONTAL,
+                    command=conf_changed)
 conf_slider.set(0.5)  # Set default value to 0.5
 conf_slider.pack()
 
@@ -104,19 +165,27 @@ conf_slider.pack()
 load_button = tk.Button(root, text="Load Image", command=load_image)
 load_button.pack()
 
-predict_button = tk.Button(root, text="Predict", command=predict)
+predict_button = tk.Button(root, text="Predict", command=predict, state="disabled")
 predict_button.pack()
 
 reset_button = tk.Button(root, text="Reset", command=reset)
 reset_button.pack()
 
-# Update toggle button text to show class name
-toggle_none_btn = tk.Button(root, text=f"Toggle '{class_names.get(none_class_idx, 'None')}' Class", command=toggle_none)
+toggle_none_btn = tk.Button(root, text="Toggle 'None' Class", command=toggle_none)
 toggle_none_btn.pack()
 
+status_label = Label(root, text="Loading model...")
+status_label.pack()
+
+plate_label = Label(root, text="", font=("Helvetica", 12, "bold"))
+plate_label.pack()
+
 img_label = Label(root)
 img_label.pack()
 # Bind mouse wheel to zoom
 root.bind("<MouseWheel>", zoom)
 
+model_manager.when_ready(root, model_future, model_loaded, model_failed)
+timer.start_export()
 root.mainloop()
+store.close()
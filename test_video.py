@@ -1,11 +1,21 @@
-from ultralytics import YOLO
 import tkinter as tk
 from tkinter import filedialog, Label, Scale, HORIZONTAL
-from PIL import Image, ImageTk
 import numpy as np
 import cv2
-from threading import Thread
-import time
+from collections import deque
+import detections
+import model_manager
+import overlay
+import plate_assembly
+import plate_format
+import plate_store
+from frame_presenter import FramePresenter
+from motion_gate import MotionGate
+from plate_dedup import PlateDeduper
+from perf_timing import timer
+from plate_tracker import PlateTracker
+from roi_inference import RoiPredictor
+from video_pipeline import VideoPipeline
 
 # Initialize all global variables
 scale = 1.0
@@ -16,17 +26,50 @@ current_frame = None
 predicted_frame = None
 frame_label = None
 show_none = True
-video_thread = None
+pipeline = None
+is_live = False
+raw_result = None
+raw_dets = None
+last_prediction = None
+frame_index = 0
+track_conf = 0.5
+roi_mode = False
+motion_gate = MotionGate()
+finished_reads = deque(maxlen=5)
+# Every final read is also kept on disk (PLATE_STORE, default plate_reads.db)
+store = plate_store.open_default()
+# A plate read again within two minutes (e.g. a car waiting at the barrier) is not reported twice
+deduper = PlateDeduper(window=120.0)
 
-# Load the YOLO model and get class names
-model = YOLO("best_yolo11n_none.pt")
-class_names = model.names
+# Start loading the YOLO model in the background; the window opens right away
+MODEL_PATH = "best_yolo11n_none.pt"
+model_future = model_manager.manager.load_async(MODEL_PATH)
+model = None
+class_names = {}
 none_class_idx = None
+plate_chars = None
+tracker = None
+roi_predictor = None
+renderer = None
 
-for idx, name in class_names.items():
-    if name.lower() == "none":
-        none_class_idx = idx
-        break
+def model_loaded(loaded):
+    global model, class_names, none_class_idx, plate_chars, tracker, roi_predictor, renderer
+    model = loaded
+    class_names = model.names
+    none_class_idx = detections.find_none_class(class_names)
+    plate_chars = plate_assembly.class_chars(class_names)
+    tracker = PlateTracker(len(plate_chars))
+    roi_predictor = RoiPredictor(model, ignore_cls=none_class_idx)
+    # Three buffers: one on screen, one waiting in the presenter, one being drawn
+    renderer = overlay.OverlayRenderer(class_names, buffers=3)
+
+    toggle_none_btn.config(text=f"Toggle '{class_names.get(none_class_idx, 'None')}' Class")
+    for button in (load_button, camera_button, play_button):
+        button.config(state="normal")
+    status_label.config(text=f"Model: {MODEL_PATH}")
+
+def model_failed(error):
+    status_label.config(text=f"Failed to load model: {error}", fg="red")
 
 def zoom(event):
     global scale, frame_label
@@ -37,97 +80,196 @@ def zoom(event):
     if current_frame is not None:
         update_frame(predicted_frame if predicted_frame is not None else current_frame)
 
-def update_frame(frame):
-    global frame_label, scale
+def update_frame(frame, callback=None):
+    # Safe from any thread: the presenter draws on the Tk main loop
     if frame is not None:
-        height, width = frame.shape[:2]
-        new_width = int(width * scale)
-        new_height = int(height * scale)
-        resized_frame = cv2.resize(frame, (new_width, new_height))
-        
-        if len(resized_frame.shape) == 3:
-            image = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB)
-        else:
-            image = cv2.cvtColor(resized_frame, cv2.COLOR_GRAY2RGB)
-            
-        image = Image.fromarray(image)
-        photo = ImageTk.PhotoImage(image=image)
-        frame_label.config(image=photo)
-        frame_label.image = photo
+        presenter.submit(frame, scale, callback)
 
 def load_video():
-    global video_path, cap, scale
+    global video_path, cap, scale, is_live
     video_path = filedialog.askopenfilename(filetypes=[("Video files", "*.mp4 *.avi *.mov")])
     if video_path:
+        stop_pipeline()
         if cap is not None:
             cap.release()
         cap = cv2.VideoCapture(video_path)
+        is_live = False
         scale = 1.0
         read_frame()
         toggle_play()
 
+def open_camera():
+    global video_path, cap, scale, is_live
+    stop_pipeline()
+    if cap is not None:
+        cap.release()
+    cap = cv2.VideoCapture(0)
+    video_path = None
+    is_live = True
+    scale = 1.0
+    toggle_play()
+
 def toggle_none():
     global show_none
     show_none = not show_none
-    if current_frame is not None:
+    # While playing, the render thread applies the new setting to its next frame.
+    # When paused nothing else is rendering, so re-filter the cached prediction here
+    if pipeline is None and raw_result is not None:
         predict_frame()
 
-def predict_frame():
-    global current_frame, predicted_frame
-    if current_frame is not None:
-        conf_threshold = float(conf_slider.get())
-        results = model(current_frame, conf=conf_threshold)
-        
-        for result in results:
-            if not show_none and none_class_idx is not None:
-                boxes = result.boxes
-                mask = boxes.cls != none_class_idx
-                result.boxes = boxes[mask]
-            
-            predicted_frame = result.plot(conf=False)
-            update_frame(predicted_frame)
+def predict_frame(stats_text=None):
+    # Filter and draw the cached prediction; runs on the render thread, so no widget access here
+    global predicted_frame
+    if current_frame is not None and raw_result is not None:
+        with timer.stage("filter"):
+            conf_threshold = track_conf
+            hidden_cls = none_class_idx if not show_none else None
+            mask = detections.keep_mask(raw_dets, conf_threshold, hidden_cls)
+            dets = detections.select(raw_dets, mask)
+            plate_text, plate_color = plate_status(dets)
+
+        with timer.stage("plot"):
+            predicted_frame = renderer.render(raw_result.orig_img, dets)
+        timer.draw_overlay(predicted_frame)
+
+        reads_text = "\n".join(finished_reads)
+
+        def show_labels():
+            plate_label.config(text=plate_text, fg=plate_color)
+            reads_label.config(text=reads_text)
+            if stats_text is not None:
+                stats_label.config(text=stats_text)
+
+        update_frame(predicted_frame, show_labels)
+
+def infer_frame(frame):
+    global last_prediction, frame_index
+    frame_index += 1
+    moving = motion_gate.update(frame)
+    if last_prediction is not None and (not moving or tracker.skip_inference()):
+        # Static scene, or every plate in view already has a converged read:
+        # reuse the last detections, drawn over the current frame
+        result, dets = last_prediction
+        reused = result[:]
+        reused.orig_img = frame
+        return reused, dets
+    # Run the network once per frame at a low threshold; the slider
+    # and the "none" toggle only mask the cached boxes afterwards
+    if roi_mode:
+        # Crop around the last plate at a smaller input size, with periodic full-frame passes
+        result = roi_predictor(frame, detections.RAW_CONF)
+    else:
+        result = model(frame, conf=detections.RAW_CONF, verbose=False)[0]
+    timer.add_speed(result)
+    dets = detections.from_result(result)
+    tracked = detections.select(dets, detections.keep_mask(dets, track_conf, none_class_idx))
+    for read in tracker.update(tracked, plate_chars, frame_index):
+        report_read(read)
+    last_prediction = (result, dets)
+    return last_prediction
+
+def report_read(read):
+    # One final read per tracked plate, voted over all the frames it was seen in
+    if deduper.is_duplicate(read.text, video_path or "camera"):
+        return
+    plate_check = plate_format.check(read.text, read.conf)
+    line = f"#{read.track_id} {plate_format.describe(read.text, plate_check)} ({read.frames} frames)"
+    finished_reads.appendleft(line)
+    store.add_read(read, source=video_path or "camera")
+
+def conf_changed(value):
+    global track_conf
+    track_conf = float(value)
+
+def toggle_roi():
+    global roi_mode
+    roi_mode = roi_var.get()
+    if roi_predictor is not None:
+        roi_predictor.reset()
+
+def motion_sensitivity_changed(value):
+    motion_gate.sensitivity = float(value)
+
+def render_frame(frame, prediction, latency):
+    # Render stage of the pipeline: show the newest inferred frame
+    global current_frame, predicted_frame, raw_result, raw_dets
+    current_frame = frame.image
+    raw_result, raw_dets = prediction
+    stats_text = None
+    running = pipeline
+    if running is not None:
+        stats_text = (f"Latency: {latency * 1000:.0f} ms   FPS: {running.fps():.1f}   "
+                      f"Dropped: {running.dropped()}   Skipped (static): {motion_gate.skip_ratio():.0%}"
+                      + (f"   ROI passes: {roi_predictor.crop_ratio():.0%}" if roi_mode else ""))
+    predict_frame(stats_text)
+
+def plate_status(dets):
+    # Assemble the digits into a plate string and check it against the DZ layout
+    read = plate_assembly.assemble(dets, plate_chars)
+    plate_check = plate_format.check(read.text, read.conf)
+    text = plate_format.describe(read.text, plate_check) if read.text else ""
+    return text, "green" if plate_check.valid else "red"
 
 def read_frame():
-    global cap, current_frame, predicted_frame
+    global cap, current_frame, predicted_frame, raw_result
     if cap is not None and cap.isOpened():
         ret, frame = cap.read()
         if ret:
             current_frame = frame
             predicted_frame = None
+            raw_result = None
             update_frame(frame)
             return True
     return False
 
-def play_video():
-    global is_playing
-    while is_playing and cap is not None:
-        if read_frame():
-            predict_frame()
-            time.sleep(1/30)  # Adjust FPS as needed
+def reset_tracking():
+    global last_prediction, frame_index
+    last_prediction = None
+    frame_index = 0
+    motion_gate.reset()
+    tracker.reset()
+    roi_predictor.reset()
+
+def stop_pipeline():
+    global pipeline, is_playing
+    if pipeline is not None:
+        stopped = pipeline.stop()
+        pipeline = None
+        if stopped:
+            # The inference thread has exited, so the tracker is no longer being updated
+            for read in tracker.flush(plate_chars):
+                report_read(read)
         else:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # Loop video
+            print("Inference thread did not stop in time; pending plate reads were not flushed")
+    is_playing = False
+    play_button.config(text="Play")
 
 def toggle_play():
-    global is_playing, video_thread
-    is_playing = not is_playing
-    play_button.config(text="Pause" if is_playing else "Play")
-    
+    global is_playing, pipeline
     if is_playing:
-        video_thread = Thread(target=play_video)
-        video_thread.daemon = True
-        video_thread.start()
+        stop_pipeline()
+    elif cap is not None:
+        reset_tracking()
+        # Decode, inference and rendering run as separate stages; stale frames
+        # are dropped rather than queued so the display never lags behind
+        pipeline = VideoPipeline(cap, infer_frame, render_frame, loop=not is_live, realtime=not is_live)
+        pipeline.start()
+        is_playing = True
+        play_button.config(text="Pause")
 
 def reset():
     global frame_label, video_path, cap, is_playing, scale
+    stop_pipeline()
     if cap is not None:
         cap.release()
     cap = None
-    frame_label.config(image="")
-    frame_label.image = None
+    presenter.clear()
     video_path = None
-    is_playing = False
     scale = 1.0
-    play_button.config(text="Play")
+    plate_label.config(text="")
+    stats_label.config(text="")
+    reads_label.config(text="")
+    finished_reads.clear()
 
 # Create Tkinter interface
 root = tk.Tk()
@@ -136,29 +278,64 @@ root.title("YOLO Video Model Tester")
 # Add confidence threshold slider
 conf_label = tk.Label(root, text="Confidence Threshold:")
 conf_label.pack()
-conf_slider = Scale(root, from_=0.0, to=1.0, resolution=0.05, orient=HORIZONTAL)
-conf_slider.set(0.5)
+conf_slider = Scale(root, from_=detections.RAW_CONF, to=1.0, resolution=0.05, orient=HORIZONTAL,
+                    command=conf_changed)
+conf_slider.set(track_conf)
 conf_slider.pack()
 
+# Motion gate: inference is skipped while the scene does not change
+motion_label = tk.Label(root, text="Motion Sensitivity (1 = always infer):")
+motion_label.pack()
+motion_slider = Scale(root, from_=0.0, to=1.0, resolution=0.05, orient=HORIZONTAL,
+                      command=motion_sensitivity_changed)
+motion_slider.set(motion_gate.sensitivity)
+motion_slider.pack()
+
 # Add buttons and frame display
-load_button = tk.Button(root, text="Load Video", command=load_video)
+load_button = tk.Button(root, text="Load Video", command=load_video, state="disabled")
 load_button.pack()
 
-play_button = tk.Button(root, text="Play", command=toggle_play)
+camera_button = tk.Button(root, text="Open Camera", command=open_camera, state="disabled")
+camera_button.pack()
+
+play_button = tk.Button(root, text="Play", command=toggle_play, state="disabled")
 play_button.pack()
 
 reset_button = tk.Button(root, text="Reset", command=reset)
 reset_button.pack()
 
-toggle_none_btn = tk.Button(root, text=f"Toggle '{class_names.get(none_class_idx, 'None')}' Class", command=toggle_none)
+toggle_none_btn = tk.Button(root, text="Toggle 'None' Class", command=toggle_none)
 toggle_none_btn.pack()
 
+status_label = Label(root, text="Loading model...")
+status_label.pack()
+
+roi_var = tk.BooleanVar(value=roi_mode)
+roi_check = tk.Checkbutton(root, text="ROI mode (crop around last plate)", variable=roi_var, command=toggle_roi)
+roi_check.pack()
+
+plate_label = Label(root, text="", font=("Helvetica", 12, "bold"))
+plate_label.pack()
+
+stats_label = Label(root, text="")
+stats_label.pack()
+
+reads_label = Label(root, text="", justify=tk.LEFT)
+reads_label.pack()
+
 frame_label = Label(root)
 frame_label.pack()
+presenter = FramePresenter(root, frame_label)
+presenter.start()
 root.bind("<MouseWheel>", zoom)
 
+model_manager.when_ready(root, model_future, model_loaded, model_failed)
+timer.start_export()
 root.mainloop()
 
 # Cleanup
+if pipeline is not None:
+    pipeline.stop()
 if cap is not None:
     cap.release()
+store.close()
@@ -3,8 +3,13 @@ from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import os
+import detections
+import model_manager
+import overlay
+import tiling
+from letterbox import Letterbox
+from perf_timing import timer
 
 class YOLOTester:
     def __init__(self, root):
@@ -53,6 +58,10 @@ class YOLOTester:
         self.original_image = None
         self.processed_image = None
         
+        # Shared letterbox buffer (model input) and its RGB copy (display)
+        self.letterbox = Letterbox(640)
+        self.display_image = np.empty((640, 640, 3), dtype=np.uint8)
+        
         # Bind mouse wheel
         self.image_label.bind('<MouseWheel>', self.mouse_wheel)  # Windows
         self.image_label.bind('<Button-4>', self.mouse_wheel)    # Linux scroll up
@@ -278,6 +287,65 @@ class YOLOTester:
         )
         self.reset_zoom_btn.pack(side=tk.LEFT, padx=5)
         
+        # Create tiled inference frame with border
+        tile_frame = tk.Frame(
+            main_container,
+            bg=self.colors['frame_bg'],
+            highlightbackground=self.colors['border'],
+            highlightthickness=1,
+            padx=5,
+            pady=5
+        )
+        tile_frame.pack(side=tk.TOP, fill=tk.X, pady=(0, 10))
+        
+        # Tiled mode toggle: split large images into overlapping tiles
+        self.tiled_var = tk.BooleanVar(value=False)
+        tiled_check = tk.Checkbutton(
+            tile_frame,
+            text="Tiled inference",
+            variable=self.tiled_var,
+            bg=self.colors['frame_bg'],
+            fg=self.colors['text'],
+            font=('Helvetica', 10)
+        )
+        tiled_check.pack(side=tk.LEFT, padx=5)
+        
+        # Tile size
+        tk.Label(
+            tile_frame,
+            text="Tile size:",
+            bg=self.colors['frame_bg'],
+            fg=self.colors['text'],
+            font=('Helvetica', 10)
+        ).pack(side=tk.LEFT, padx=5)
+        self.tile_size_var = tk.IntVar(value=640)
+        tk.Spinbox(
+            tile_frame,
+            from_=320,
+            to=1280,
+            increment=160,
+            width=6,
+            textvariable=self.tile_size_var
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # Tile overlap
+        tk.Label(
+            tile_frame,
+            text="Overlap:",
+            bg=self.colors['frame_bg'],
+            fg=self.colors['text'],
+            font=('Helvetica', 10)
+        ).pack(side=tk.LEFT, padx=5)
+        self.tile_overlap_var = tk.DoubleVar(value=0.2)
+        tk.Spinbox(
+            tile_frame,
+            from_=0.0,
+            to=0.5,
+            increment=0.05,
+            width=5,
+            textvariable=self.tile_overlap_var
+        ).pack(side=tk.LEFT, padx=5)
+        
         # Create image container with border
         image_container = tk.Frame(
             main_container,
@@ -385,12 +453,14 @@ class YOLOTester:
             new_width = int(640 * self.zoom_factor)
             new_height = int(640 * self.zoom_factor)
             
-            # Resize the image
-            resized_image = cv2.resize(self.processed_image, (new_width, new_height))
-            
-            # Update the display
-            self.photo = ImageTk.PhotoImage(image=Image.fromarray(resized_image))
-            self.image_label.config(image=self.photo)
+            with timer.stage("display"):
+                # Resize the image
+                resized_image = cv2.resize(self.processed_image, (new_width, new_height))
+                
+                # Update the display
+                self.photo = ImageTk.PhotoImage(image=Image.fromarray(resized_image))
+                self.image_label.config(image=self.photo)
+            timer.frame_done()
             
             # Update canvas scrollregion
             self.canvas.configure(scrollregion=self.canvas.bbox("all"))
@@ -401,12 +471,13 @@ class YOLOTester:
                 self.canvas.yview_moveto(0)
         
     def process_image(self, image):
-        """Process image to 640x640 size"""
-        # Resize image to 640x640
-        image_resized = cv2.resize(image, (640, 640))
-        # Convert BGR to RGB
-        rgb_image = cv2.cvtColor(image_resized, cv2.COLOR_BGR2RGB)
-        return rgb_image
+        """Letterbox image into the shared 640x640 buffer and return its RGB display copy"""
+        with timer.stage("letterbox"):
+            # Keep the aspect ratio; the padded buffer is also what the model sees
+            letterboxed = self.letterbox.apply(image)
+            # Convert BGR to RGB into the preallocated display buffer
+            cv2.cvtColor(letterboxed, cv2.COLOR_BGR2RGB, dst=self.display_image)
+        return self.display_image
         
     def load_model(self):
         file_path = filedialog.askopenfilename(
@@ -415,26 +486,47 @@ class YOLOTester:
         
         if file_path:
             try:
-                self.model = YOLO(file_path)
-                self.model_name = os.path.basename(file_path)
-                self.model_label.config(
-                    text=f"Model: {self.model_name}",
-                    fg=self.colors['success']
-                )
-                
-                # Enable buttons after model is loaded
-                self.enable_buttons()
-                
-                messagebox.showinfo("Success", f"Model '{self.model_name}' loaded successfully!")
-                
+                # Load in the background; models are cached by path and mtime,
+                # so picking a previously used file again is instant
+                future = model_manager.manager.load_async(file_path)
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to load model: {str(e)}")
-                self.model_label.config(
-                    text="No model loaded",
-                    fg=self.colors['accent']
-                )
-                self.model = None
-                self.configure_disabled_states()
+                self.model_load_failed(e)
+                return
+            
+            self.model_label.config(
+                text=f"Loading {os.path.basename(file_path)}...",
+                fg=self.colors['warning']
+            )
+            model_manager.when_ready(
+                self.root,
+                future,
+                lambda model: self.model_loaded(model, file_path),
+                self.model_load_failed
+            )
+    
+    def model_loaded(self, model, file_path):
+        self.model = model
+        self.model_name = os.path.basename(file_path)
+        # Draws boxes straight into an RGB buffer, ready for display
+        self.renderer = overlay.OverlayRenderer(model.names, rgb=True)
+        self.model_label.config(
+            text=f"Model: {self.model_name}",
+            fg=self.colors['success']
+        )
+        
+        # Enable buttons after model is loaded
+        self.enable_buttons()
+        
+        messagebox.showinfo("Success", f"Model '{self.model_name}' loaded successfully!")
+    
+    def model_load_failed(self, e):
+        messagebox.showerror("Error", f"Failed to load model: {str(e)}")
+        self.model_label.config(
+            text="No model loaded",
+            fg=self.colors['accent']
+        )
+        self.model = None
+        self.configure_disabled_states()
         
     def select_image(self):
         if self.model is None:
@@ -448,14 +540,15 @@ class YOLOTester:
         if file_path:
             try:
                 # Read and display the image
-                self.current_image = cv2.imread(file_path)
+                with timer.stage("decode"):
+                    self.current_image = cv2.imread(file_path)
                 if self.current_image is None:
                     raise Exception("Failed to load image")
                 
                 # Store original image for reset functionality
-                self.original_image = self.current_image.copy()
+                self.original_image = self.current_image
                 
-                # Process image to 640x640
+                # Letterbox once to 640x640
                 self.processed_image = self.process_image(self.current_image)
                 
                 # Reset zoom and update display
@@ -469,8 +562,9 @@ class YOLOTester:
     
     def reset_image(self):
         if self.original_image is not None:
-            self.current_image = self.original_image.copy()
-            self.processed_image = self.process_image(self.current_image)
+            # The clean letterboxed copy is still in the display buffer
+            self.current_image = self.original_image
+            self.processed_image = self.display_image
             self.reset_zoom()
     
     def detect_objects(self):
@@ -483,20 +577,35 @@ class YOLOTester:
             return
             
         try:
-            # Ensure image is 640x640 for detection
-            resized_image = cv2.resize(self.current_image, (640, 640))
-            
-            # Run detection
-            results = self.model(resized_image)
-            
-            # Get the first result
-            result = results[0]
-            
-            # Draw boxes on the image without confidence scores
-            annotated_image = result.plot(conf=False)
+            if self.tiled_var.get():
+                # Run overlapping full-resolution tiles as one batch and merge across seams
+                result = tiling.tiled_predict(
+                    self.model,
+                    self.current_image,
+                    tile=self.tile_size_var.get(),
+                    overlap=self.tile_overlap_var.get()
+                )
+                timer.add_speed(result)
+                
+                # Draw on the letterboxed buffer instead of the full-resolution image
+                with timer.stage("plot"):
+                    dets = self.letterbox.dets_to_buffer(detections.from_result(result))
+                    annotated_image = self.renderer.render(self.letterbox.buffer, dets)
+            else:
+                # Run detection on the shared letterboxed buffer
+                results = self.model(self.letterbox.buffer)
+                
+                # Get the first result
+                result = results[0]
+                timer.add_speed(result)
+                
+                # Draw boxes on the image without confidence scores
+                with timer.stage("plot"):
+                    annotated_image = self.renderer.render(self.letterbox.buffer, detections.from_result(result))
             
-            # Convert BGR to RGB
-            self.processed_image = cv2.cvtColor(annotated_image, cv2.COLOR_BGR2RGB)
+            timer.draw_overlay(annotated_image, rgb=True)
+            # Already RGB
+            self.processed_image = annotated_image
             
             # Update display with zoom
             self.update_zoom()
@@ -539,4 +648,5 @@ class YOLOTester:
 if __name__ == "__main__":
     root = tk.Tk()
     app = YOLOTester(root)
+    timer.start_export()
     root.mainloop() 
\ No newline at end of file
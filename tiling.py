@@ -0,0 +1,82 @@
+"""Tiled inference for large frames with small plates
+
+A 4K overview frame squashed to 640 leaves plate digits a few pixels tall. In
+tiled mode the image is cut into overlapping tiles that are inferred as one
+batch, then the per-tile boxes are shifted back and merged across the seams.
+"""
+import math
+
+import numpy as np
+
+import detections
+
+
+def _starts(size, tile, count):
+    if count <= 1 or size <= tile:
+        return [0]
+    return np.linspace(0, size - tile, count).round().astype(int).tolist()
+
+
+def tile_grid(height, width, tile=640, overlap=0.2, grid=None):
+    """Return (x0, y0, x1, y1) tiles covering the image
+
+    Either give a tile size in pixels with a minimum `overlap` fraction, or a
+    fixed `grid` of (columns, rows); the tile size then follows from the overlap.
+    """
+    if grid is not None:
+        cols, rows = grid
+        tile_w = math.ceil(width / (cols - (cols - 1) * overlap))
+        tile_h = math.ceil(height / (rows - (rows - 1) * overlap))
+    else:
+        tile_w = tile_h = tile
+        step = max(1, int(tile * (1 - overlap)))
+        cols = math.ceil(max(width - tile, 0) / step) + 1
+        rows = math.ceil(max(height - tile, 0) / step) + 1
+    tile_w, tile_h = min(tile_w, width), min(tile_h, height)
+    return [
+        (x, y, x + tile_w, y + tile_h)
+        for y in _starts(height, tile_h, rows)
+        for x in _starts(width, tile_w, cols)
+    ]
+
+
+def merge_boxes(xyxy, scores, classes, threshold=0.6):
+    """Class-aware greedy NMS over boxes from overlapping tiles; returns kept indices
+
+    Overlap is measured as intersection over the smaller box, so a digit cut in
+    half at a tile edge is absorbed by the full box from the neighbouring tile.
+    """
+    order = np.argsort(-scores, kind="stable")
+    area = np.prod(xyxy[:, 2:] - xyxy[:, :2], axis=1)
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        tl = np.maximum(xyxy[i, :2], xyxy[rest, :2])
+        br = np.minimum(xyxy[i, 2:], xyxy[rest, 2:])
+        inter = np.prod(np.clip(br - tl, 0, None), axis=1)
+        overlap = inter / np.maximum(np.minimum(area[i], area[rest]), 1e-9)
+        order = rest[(overlap <= threshold) | (classes[rest] != classes[i])]
+    return np.array(keep, dtype=np.int64)
+
+
+def tiled_predict(model, image, conf=0.25, tile=640, overlap=0.2, grid=None, imgsz=640, merge_threshold=0.6):
+    """Infer `image` tile by tile in one batch; returns a single full-image result"""
+    height, width = image.shape[:2]
+    tiles = tile_grid(height, width, tile, overlap, grid)
+    crops = [image[y0:y1, x0:x1] for x0, y0, x1, y1 in tiles]
+    results = model(crops, conf=conf, imgsz=imgsz, verbose=False)
+
+    parts = [detections.from_result(r) for r in results]
+    offsets = np.concatenate([
+        np.tile(np.array([x0, y0, x0, y0], dtype=np.float32), (len(d.cls), 1))
+        for (x0, y0, _, _), d in zip(tiles, parts)
+    ])
+    xyxy = np.concatenate([d.xyxy for d in parts]) + offsets
+    scores = np.concatenate([d.conf for d in parts])
+    classes = np.concatenate([d.cls for d in parts])
+
+    keep = merge_boxes(xyxy, scores, classes, merge_threshold)
+    data = np.concatenate([xyxy[keep], scores[keep, None], classes[keep, None].astype(np.float32)], axis=1)
+    return detections.result_with_boxes(results[0], image, data)
@@ -0,0 +1,165 @@
+"""Threaded decode -> infer -> render pipeline for live video
+
+Each stage runs on its own thread and hands work to the next one through a
+single-slot mailbox. When a stage falls behind, the newer frame replaces the
+unread one ("latest frame wins"), so slow inference drops stale frames instead
+of queueing them up and adding latency.
+"""
+import time
+from collections import deque, namedtuple
+from threading import Condition, Thread
+
+import cv2
+
+from perf_timing import timer
+
+# index: frame number from the decoder, image: BGR frame, t_decode: perf_counter() at decode
+Frame = namedtuple("Frame", ["index", "image", "t_decode"])
+
+
+class LatestSlot:
+    """Bounded (size 1) queue where a new item replaces an unread one"""
+
+    def __init__(self):
+        self._cond = Condition()
+        self._item = None
+        self._full = False
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._full:
+                self.dropped += 1
+            self._item = item
+            self._full = True
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Wait for the next item; returns None once the slot is closed or on timeout"""
+        with self._cond:
+            if not self._full and not self._closed:
+                self._cond.wait(timeout)
+            if not self._full:
+                return None
+            item = self._item
+            self._item = None
+            self._full = False
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class VideoPipeline:
+    """Run decode, inference and rendering of a cv2.VideoCapture on separate threads
+
+    infer(image) -> prediction runs on the inference thread.
+    render(frame, prediction, latency) runs on the render thread, where
+    latency is the decode-to-render time of that frame in seconds.
+    For files the decoder is paced to the source frame rate (`realtime`) and
+    rewinds at the end when `loop` is set; live cameras are read as fast as
+    they deliver frames.
+    """
+
+    def __init__(self, cap, infer, render, loop=True, realtime=True, stats_window=60):
+        self.cap = cap
+        self.infer = infer
+        self.render = render
+        self.loop = loop
+        self.realtime = realtime
+        self.running = False
+        self.infer_slot = LatestSlot()
+        self.render_slot = LatestSlot()
+        self.latencies = deque(maxlen=stats_window)
+        self.render_times = deque(maxlen=stats_window)
+        self.threads = []
+
+    def start(self):
+        self.running = True
+        self.threads = [
+            Thread(target=self._decode_loop, daemon=True),
+            Thread(target=self._infer_loop, daemon=True),
+            Thread(target=self._render_loop, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop every stage, waiting up to `timeout` seconds per thread
+
+        Returns True once every stage has exited. Only then is it safe to touch
+        the state infer() and render() use (e.g. flush a tracker) from the
+        caller's thread. The wait is bounded because the caller is usually the
+        Tk thread, and a stage stuck on a camera read must not freeze the UI.
+        """
+        self.running = False
+        self.infer_slot.close()
+        self.render_slot.close()
+        for thread in self.threads:
+            thread.join(timeout)
+        stopped = not any(thread.is_alive() for thread in self.threads)
+        self.threads = []
+        return stopped
+
+    def _decode_loop(self):
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_interval = 1.0 / fps if self.realtime else 0.0
+        next_time = time.perf_counter()
+        index = 0
+        while self.running:
+            with timer.stage("decode"):
+                ret, image = self.cap.read()
+            if not ret:
+                if not self.loop:
+                    break
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # Loop video
+                continue
+            if frame_interval:
+                # Pace file playback to the source rate instead of racing through it
+                next_time += frame_interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.perf_counter()
+            self.infer_slot.put(Frame(index, image, time.perf_counter()))
+            index += 1
+        self.infer_slot.close()
+
+    def _infer_loop(self):
+        while self.running:
+            frame = self.infer_slot.get()
+            if frame is None:
+                break
+            self.render_slot.put((frame, self.infer(frame.image)))
+        self.render_slot.close()
+
+    def _render_loop(self):
+        while self.running:
+            item = self.render_slot.get()
+            if item is None:
+                break
+            frame, prediction = item
+            now = time.perf_counter()
+            latency = now - frame.t_decode
+            self.latencies.append(latency)
+            self.render_times.append(now)
+            self.render(frame, prediction, latency)
+
+    def fps(self):
+        """Rendered frames per second over the stats window"""
+        if len(self.render_times) < 2:
+            return 0.0
+        span = self.render_times[-1] - self.render_times[0]
+        return (len(self.render_times) - 1) / span if span > 0 else 0.0
+
+    def dropped(self):
+        """Frames discarded because a later stage was still busy"""
+        return self.infer_slot.dropped + self.render_slot.dropped
@@ -0,0 +1,164 @@
+"""Headless batched plate detection over recorded video
+
+The video is decoded on a producer thread. Every `--stride`-th frame inside the
+optional `--start`/`--end` window goes to the model, N frames per call. Rows
+are streamed to a JSONL or CSV file as they are produced:
+
+    kind "frame": per-frame detections and the assembled plate (as in batch_predict.py)
+    kind "read":  one voted read per tracked plate, written when the track ends
+
+Only a bounded queue of decoded frames is held in memory.
+
+    python video_predict.py gate_2024-05-01.mp4 -o reads.jsonl --stride 5 --batch 16
+    python video_predict.py cam.mp4 --start 08:00:00 --end 09:30:00 --skip-empty
+"""
+import argparse
+import queue
+import sys
+import time
+from threading import Thread
+
+import cv2
+
+import backends
+import detections
+import plate_assembly
+import plate_format
+import plate_store
+from batch_predict import iter_batches, plate_record
+from plate_tracker import PlateTracker
+from result_writer import ResultWriter
+
+FIELDS = ["kind", "video", "frame", "time_s", "count", "plate", "plate_conf", "plate_valid", "wilaya",
+          "suggestions", "detections", "track_id", "frames", "first_frame", "last_frame"]
+_DONE = object()
+
+
+def parse_time(value):
+    """Seconds from "90", "01:30" or "00:01:30" """
+    if value is None:
+        return None
+    seconds = 0.0
+    for part in value.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def start_decoder(path, stride=1, start=None, end=None, prefetch=64):
+    """Decode `path` on a background thread into a bounded queue
+
+    Yields (frame_index, time_s, image) for every `stride`-th frame between
+    `start` and `end` seconds. Skipped frames are only grabbed, not decoded
+    into images.
+    """
+    frame_queue = queue.Queue(maxsize=max(1, prefetch))
+
+    def decode():
+        cap = cv2.VideoCapture(path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        first = index = int(start * fps) if start else 0
+        if first:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+        last = int(end * fps) if end is not None else None
+        while cap.isOpened() and (last is None or index <= last):
+            if (index - first) % stride:
+                if not cap.grab():
+                    break
+            else:
+                ret, image = cap.read()
+                if not ret:
+                    break
+                frame_queue.put((index, index / fps, image))
+            index += 1
+        cap.release()
+        frame_queue.put(_DONE)
+
+    Thread(target=decode, daemon=True).start()
+    while True:
+        item = frame_queue.get()
+        if item is _DONE:
+            break
+        yield item
+
+
+def read_row(video, read):
+    plate_check = plate_format.check(read.text, read.conf)
+    return {"kind": "read", "video": video, "track_id": read.track_id, "plate": read.text,
+            "plate_conf": [round(float(c), 4) for c in read.conf], "plate_valid": plate_check.valid,
+            "wilaya": plate_check.wilaya_name, "frames": read.frames,
+            "first_frame": read.first_frame, "last_frame": read.last_frame}
+
+
+def run(model, path, writer, batch_size=16, conf=0.5, imgsz=640, stride=1, start=None, end=None,
+        prefetch=64, skip_empty=False, store=None):
+    """Process one video, writing frame and read rows; returns the number of inferred frames
+
+    Plate reads also go to `store` (a plate_store.PlateStore) when given.
+    """
+    class_names = model.names
+    chars = plate_assembly.class_chars(class_names)
+    none_class_idx = detections.find_none_class(class_names)
+    # Tracks may miss a few sampled frames, so scale the patience down with the stride
+    tracker = PlateTracker(len(chars), max_missed=max(2, 10 // stride))
+    count = 0
+    for batch in iter_batches(start_decoder(path, stride, start, end, prefetch), batch_size):
+        results = model([image for _, _, image in batch], conf=conf, imgsz=imgsz, verbose=False)
+        for (index, time_s, _), result in zip(batch, results):
+            dets = detections.from_result(result)
+            count += 1
+            tracked = detections.select(dets, detections.keep_mask(dets, conf, none_class_idx))
+            for read in tracker.update(tracked, chars, index):
+                writer.write(read_row(path, read))
+                if store is not None:
+                    store.add_read(read, source=path)
+            if skip_empty and len(dets.cls) == 0:
+                continue
+            row = {"kind": "frame", "video": path, "frame": index, "time_s": round(time_s, 3)}
+            row.update(plate_record(dets, chars, class_names))
+            writer.write(row)
+    for read in tracker.flush(chars):
+        writer.write(read_row(path, read))
+        if store is not None:
+            store.add_read(read, source=path)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batched plate detection over recorded video files")
+    parser.add_argument("videos", nargs="+", help="video files")
+    parser.add_argument("-o", "--output", default="video_predictions.jsonl", help="output file (.jsonl or .csv)")
+    parser.add_argument("--model", default="best_yolo11n_none.pt")
+    parser.add_argument("--backend", choices=("auto",) + backends.BACKENDS, default=None,
+                        help="inference runtime (default: fastest available)")
+    parser.add_argument("--int8", action="store_true", default=None,
+                        help="use the INT8 OpenVINO model built by quantize.py")
+    parser.add_argument("--batch", type=int, default=16, help="frames per model call")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--stride", type=int, default=1, help="process every Nth frame")
+    parser.add_argument("--start", help="start time (seconds or HH:MM:SS)")
+    parser.add_argument("--end", help="end time (seconds or HH:MM:SS)")
+    parser.add_argument("--prefetch", type=int, default=64, help="max decoded frames held in memory")
+    parser.add_argument("--skip-empty", action="store_true", help="do not write frames without detections")
+    parser.add_argument("--store", help="also keep the plate reads in this plate_store database")
+    args = parser.parse_args(argv)
+
+    model = backends.load_model(args.model, args.backend, args.int8)
+    start, end = parse_time(args.start), parse_time(args.end)
+    store = plate_store.PlateStore(args.store) if args.store else None
+
+    begin = time.perf_counter()
+    count = 0
+    with ResultWriter(args.output, FIELDS) as writer:
+        for video in args.videos:
+            count += run(model, video, writer, args.batch, args.conf, args.imgsz, max(1, args.stride),
+                         start, end, args.prefetch, args.skip_empty, store)
+    if store is not None:
+        store.close()
+    elapsed = time.perf_counter() - begin
+    print(f"{count} frames in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.1f} frames/sec) -> {args.output}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Read YOLO-format datasets (as downloaded from Roboflow in plate_test_2.py)
+
+    <root>/data.yaml
+    <root>/<split>/images/*.jpg
+    <root>/<split>/labels/*.txt   one "cls cx cy w h" line per box, normalized
+"""
+import os
+
+import numpy as np
+import yaml
+
+import detections
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def read_data_yaml(path):
+    """Load data.yaml; returns (config dict, class names dict)"""
+    with open(path, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    names = config.get("names", {})
+    if isinstance(names, list):
+        names = dict(enumerate(names))
+    return config, names
+
+
+def split_dir(data_yaml, split):
+    """Resolve the images directory of a split
+
+    Roboflow writes paths such as "../valid/images" that are really relative
+    to the dataset root, so both readings are tried.
+    """
+    config, _ = read_data_yaml(data_yaml)
+    root = os.path.dirname(os.path.abspath(data_yaml))
+    base = os.path.join(root, config.get("path", ""))
+    entry = config.get(split) or config.get("valid" if split == "val" else split)
+    if entry is None:
+        raise KeyError(f"split '{split}' not in {data_yaml}")
+    candidates = [os.path.join(base, entry), os.path.join(root, entry)]
+    stripped = entry
+    while stripped.startswith("../"):
+        stripped = stripped[3:]
+    candidates.append(os.path.join(root, stripped))
+    for candidate in candidates:
+        if os.path.isdir(candidate):
+            return os.path.normpath(candidate)
+    raise FileNotFoundError(f"images for split '{split}' not found (tried {candidates})")
+
+
+def label_path(image_path):
+    """labels/<stem>.txt next to images/<stem>.jpg"""
+    head, name = os.path.split(image_path)
+    parent, leaf = os.path.split(head)
+    label_dir = os.path.join(parent, "labels") if leaf == "images" else head
+    return os.path.join(label_dir, os.path.splitext(name)[0] + ".txt")
+
+
+def list_images(images_dir):
+    return sorted(
+        os.path.join(images_dir, f)
+        for f in os.listdir(images_dir)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def read_labels(path):
+    """Read a label file as a (N, 5) float32 array of cls, cx, cy, w, h (normalized)"""
+    if not os.path.exists(path):
+        return np.zeros((0, 5), dtype=np.float32)
+    rows = np.loadtxt(path, dtype=np.float32, ndmin=2)
+    if rows.size == 0:
+        return np.zeros((0, 5), dtype=np.float32)
+    return rows[:, :5]
+
+
+def labels_to_detections(labels, width, height):
+    """Turn normalized YOLO labels into pixel-space ground-truth Detections (conf = 1)"""
+    cx, cy, w, h = labels[:, 1] * width, labels[:, 2] * height, labels[:, 3] * width, labels[:, 4] * height
+    xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1).astype(np.float32)
+    return detections.Detections(
+        xyxy.reshape(-1, 4), labels[:, 0].astype(np.int64), np.ones(len(labels), dtype=np.float32)
+    )